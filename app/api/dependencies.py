@@ -0,0 +1,15 @@
+from fastapi import Request
+from app.services.evaluation_jobs import EvaluationJobQueue
+from app.services.policy_eval_pipeline import PolicyEvalPipeline
+from app.services.qa_service import QAService
+
+# Shared services are created once in the app's lifespan (see app.main) and stored on app.state.
+
+def get_qa_service(request: Request) -> QAService:
+    return request.app.state.qa_service
+
+def get_evaluation_pipeline(request: Request) -> PolicyEvalPipeline:
+    return request.app.state.evaluation_pipeline
+
+def get_evaluation_jobs(request: Request) -> EvaluationJobQueue:
+    return request.app.state.evaluation_jobs
@@ -1,7 +1,13 @@
-from fastapi import APIRouter, Body, HTTPException
-from ..schemas.evaluation import EvaluationRequest, EvaluationResponse
+from fastapi import APIRouter, Body, Depends, HTTPException, status
+from ..dependencies import get_evaluation_jobs, get_evaluation_pipeline
+from ..schemas.evaluation import EvaluationRequest, EvaluationResponse, EvaluationTask
+from ...services.decision_rules import RULES_VERSION
+from ...services.evaluation_jobs import COMPLETED, FAILED, QUEUED, RUNNING, EvaluationJobQueue, QueueFullError
 from ...services.policy_eval_pipeline import PolicyEvalPipeline
-from ...utils.error_handlers import DocumentProcessingError
+from ...utils.error_handlers import DocumentProcessingError, EvaluationQueueFullError, TaskNotFoundError, TaskNotReadyError
+from ...utils.metrics import metrics
+from fastapi.responses import JSONResponse
+from typing import Optional
 import uuid
 from datetime import datetime, timezone
 import time
@@ -10,21 +16,32 @@ router = APIRouter()
 
 @router.post("/evaluate", response_model=EvaluationResponse)
 async def evaluate_policy(
-    request: EvaluationRequest = Body(...)
+    request: EvaluationRequest = Body(...),
+    pipeline: PolicyEvalPipeline = Depends(get_evaluation_pipeline)
 ):
     """
     This is the primary endpoint for the simplified PolicyEval-GPT service.
     It processes the request synchronously and returns the full evaluation.
+    For long evaluations behind short proxy timeouts, use POST /evaluate/jobs instead.
     """
-    start_time = time.time()
-    request_id = str(uuid.uuid4())
-
     try:
-        pipeline = PolicyEvalPipeline()
-        result = await pipeline.process_request(request.dict())
+        response_data = await run_evaluation(request, pipeline)
     except Exception as e:
         raise DocumentProcessingError(str(e))
 
+    with metrics.time_stage("response_serialization"):
+        # Serialize here rather than in FastAPI so the cost is measured.
+        response = EvaluationResponse(**response_data)
+        return JSONResponse(content=response.dict())
+
+
+async def run_evaluation(request: EvaluationRequest, pipeline: PolicyEvalPipeline) -> dict:
+    """Runs the pipeline for one request and maps its result to the EvaluationResponse fields."""
+    start_time = time.time()
+    request_id = str(uuid.uuid4())
+
+    result = await pipeline.process_request(request.dict())
+
     processing_time_ms = int((time.time() - start_time) * 1000)
 
     # Map the detailed pipeline result to the final response schema
@@ -38,7 +55,7 @@ async def evaluate_policy(
                 "matched_criteria": item.get("matched_criteria", []),
                 "confidence": item.get("relevance_score", 0.0),
                 "rule_type": item.get("clause_type", "general"), # Updated from decision_impact
-                "source": {"document": "source_doc", "page": 1, "section": "Details"} # Placeholder
+                "source": item.get("source") or {"document": "source_doc", "page": 1, "section": "Details"}
             })
 
     # The final decision from the pipeline now contains much richer data
@@ -49,11 +66,11 @@ async def evaluate_policy(
         "decision": {
             "status": result.get("decision", "requires_review"),
             "confidence_score": result.get("confidence_score", 0.5),
-            "risk_level": "medium" # Placeholder, can be derived from risk_factors later
+            "risk_level": result.get("risk_level", "medium")
         },
         "coverage": {
             "approved_amount": result.get("approved_amount", 0),
-            "maximum_eligible": 0, # Placeholder
+            "maximum_eligible": result.get("maximum_eligible", 0),
             "currency": "INR",
             "breakdown": { # Placeholder
                 "base_coverage": 0,
@@ -61,7 +78,7 @@ async def evaluate_policy(
                 "deductible": 0,
                 "additional_benefits": 0
             },
-            "waiting_period": { # Placeholder
+            "waiting_period": result.get("waiting_period") or {
                 "required_months": 0,
                 "elapsed_months": 0,
                 "status": "not_met"
@@ -76,17 +93,65 @@ async def evaluate_policy(
             "similar_claims": 0
         },
         "processing_metadata": {
-            "documents_processed": len(request.documents),
-            "documents_failed": 0,
+            "documents_processed": result.get("documents_processed", len(request.documents)),
+            "documents_failed": result.get("documents_failed", 0),
             "clauses_evaluated": len(justifications),
             "ai_model": "gemini-1.5-flash-latest",
             "model_version": "v1",
-            "business_rules_version": "v2", # Incremented for new logic
-            "cache_hit_ratio": 0.0,
+            "business_rules_version": RULES_VERSION,
+            "cache_hit_ratio": result.get("cache_hit_ratio", 0.0),
             "gemini_tokens_used": result.get("token_usage", 0) # Placeholder for now
         },
         "warnings": [],
         "error": result.get("error")
     }
+    # Validate now so a malformed result fails the job instead of the later result fetch.
+    return EvaluationResponse(**response_data).dict()
+
+
+TASK_MESSAGES = {
+    QUEUED: "Evaluation is queued.",
+    RUNNING: "Evaluation is running.",
+    COMPLETED: "Evaluation is complete; fetch it from the result endpoint.",
+}
+
+
+def _task(task_id: str, task_status: str, error: Optional[str] = None) -> EvaluationTask:
+    message = f"Evaluation failed: {error}" if task_status == FAILED else TASK_MESSAGES[task_status]
+    return EvaluationTask(task_id=task_id, status=task_status, message=message)
+
+
+@router.post("/evaluate/jobs", response_model=EvaluationTask, status_code=status.HTTP_202_ACCEPTED)
+async def submit_evaluation(
+    request: EvaluationRequest = Body(...),
+    evaluation_jobs: EvaluationJobQueue = Depends(get_evaluation_jobs)
+):
+    """
+    Queues an evaluation and returns its task at once, without waiting for the pipeline.
+    Poll GET /evaluate/jobs/{task_id} for status and GET /evaluate/jobs/{task_id}/result for the result.
+    """
+    try:
+        task_id = evaluation_jobs.submit(request)
+    except QueueFullError:
+        raise EvaluationQueueFullError()
+    return _task(task_id, QUEUED)
+
+
+@router.get("/evaluate/jobs/{task_id}", response_model=EvaluationTask)
+async def get_evaluation_status(task_id: str, evaluation_jobs: EvaluationJobQueue = Depends(get_evaluation_jobs)):
+    record = evaluation_jobs.store.get(task_id)
+    if record is None:
+        raise TaskNotFoundError(task_id)
+    return _task(task_id, record.status, record.error)
+
 
-    return EvaluationResponse(**response_data)
+@router.get("/evaluate/jobs/{task_id}/result", response_model=EvaluationResponse)
+async def get_evaluation_result(task_id: str, evaluation_jobs: EvaluationJobQueue = Depends(get_evaluation_jobs)):
+    record = evaluation_jobs.store.get(task_id)
+    if record is None:
+        raise TaskNotFoundError(task_id)
+    if record.status == FAILED:
+        raise DocumentProcessingError(record.error)
+    if record.status != COMPLETED:
+        raise TaskNotReadyError(task_id, record.status)
+    return JSONResponse(content=record.result)
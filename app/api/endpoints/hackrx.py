@@ -1,16 +1,21 @@
+import json
+from typing import Literal
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.api.dependencies import get_qa_service
 from app.api.schemas.evaluation import HackRxRequest, HackRxResponse
+from app.core.config import settings
 from app.core.security import get_api_key
 from app.services.qa_service import QAService
+from app.utils.metrics import metrics
 
 router = APIRouter()
 
-qa_service = QAService()
-
 @router.post("/run", response_model=HackRxResponse, tags=["Q&A"])
 async def run_hackrx_evaluation(
     request: HackRxRequest,
-    api_key: str = Depends(get_api_key)
+    api_key: str = Depends(get_api_key),
+    qa_service: QAService = Depends(get_qa_service)
 ):
     """
     This endpoint processes a document from a URL against a list of questions.
@@ -21,9 +26,55 @@ async def run_hackrx_evaluation(
     """
     try:
         answers = await qa_service.answer_questions(request)
-        return HackRxResponse(answers=answers)
+        with metrics.time_stage("response_serialization"):
+            # Serialize here rather than in FastAPI so the cost is measured.
+            response = HackRxResponse(answers=answers)
+            return JSONResponse(content=response.dict())
     except Exception as e:
         # For debugging, it's helpful to see the error.
         # In production, you might want a more generic error message.
         print(f"An error occurred: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/run/stream", tags=["Q&A"])
+async def run_hackrx_evaluation_stream(
+    request: HackRxRequest,
+    format: Literal["ndjson", "sse"] = "ndjson",
+    api_key: str = Depends(get_api_key),
+    qa_service: QAService = Depends(get_qa_service)
+):
+    """
+    Streaming variant of `/run` that emits each answer as soon as it is ready.
+
+    - **Response**: One event per answer, `{"index": <question index>, "question": ..., "answer": ...}`,
+      in completion order, followed by `{"done": true}`. Use `?format=sse` for Server-Sent Events
+      instead of newline-delimited JSON.
+    - **Errors**: Failures while fetching or indexing the document return a 500 before streaming starts.
+      Failures after that are reported as a final `{"error": ...}` event.
+    """
+    try:
+        # Small batches (one question per LLM call by default), so no answer waits for others.
+        answer_batches = await qa_service.start_answering(request, batch_size=settings.STREAM_ANSWER_BATCH_SIZE)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    def encode(event: str, payload: dict) -> str:
+        data = json.dumps(payload)
+        if format == "sse":
+            return f"event: {event}\ndata: {data}\n\n"
+        return f"{data}\n"
+
+    async def event_stream():
+        try:
+            async for index, answer in qa_service.iter_answers(answer_batches):
+                yield encode("answer", {"index": index, "question": request.questions[index], "answer": answer})
+        except Exception as e:
+            print(f"An error occurred while streaming answers: {e}")
+            yield encode("error", {"error": str(e)})
+            return
+        yield encode("done", {"done": True})
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    # Disable proxy buffering so each event reaches the client immediately.
+    return StreamingResponse(event_stream(), media_type=media_type, headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache"})
@@ -1,6 +1,8 @@
 from fastapi import APIRouter
 from datetime import datetime, timezone
+from fastapi.responses import PlainTextResponse
 from ..schemas.health import HealthCheckResponse, ServiceStatus, HealthMetrics
+from ...utils.metrics import metrics
 
 router = APIRouter()
 
@@ -13,9 +15,14 @@ def health_check():
         status="healthy",
         timestamp=datetime.now(timezone.utc).isoformat(),
         services=ServiceStatus(),
-        metrics=HealthMetrics(
-            requests_per_minute=0, # Placeholder
-            average_response_time=0.0, # Placeholder
-            error_rate=0.0 # Placeholder
-        )
+        # Sliding one-minute window fed by the request metrics middleware
+        metrics=HealthMetrics(**metrics.recent_summary())
     )
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """
+    Exposes per-stage latency histograms and HTTP request metrics in Prometheus text format.
+    """
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
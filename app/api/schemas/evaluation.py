@@ -66,6 +66,8 @@ class JustificationSource(BaseModel):
     document: str
     page: int
     section: str
+    start_offset: Optional[int] = None
+    end_offset: Optional[int] = None
 
 class Justification(BaseModel):
     clause_id: str
@@ -7,15 +7,112 @@ class Settings(BaseSettings):
     GEMINI_API_KEY: str
     HACKRX_API_KEY: str = "default_hackrx_key"
 
+    # Ingestion cache: processed chunks + embeddings keyed by document content hash
+    INGESTION_CACHE_ENABLED: bool = True
+    INGESTION_CACHE_DIR: str = ".cache/ingestion"
+    INGESTION_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+
+    # Document downloads (shared pooled HTTP client)
+    DOCUMENT_FETCH_TIMEOUT_SECONDS: float = 15.0
+    DOCUMENT_MAX_BYTES: int = 50 * 1024 * 1024
+    DOCUMENT_SPOOL_THRESHOLD_BYTES: int = 5 * 1024 * 1024
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+
+    # Text extraction process pool
+    EXTRACTION_MAX_WORKERS: int = min(4, os.cpu_count() or 1)
+    EXTRACTION_TIMEOUT_SECONDS: float = 60.0
+
+    # OCR fallback for scanned PDF pages (text layer shorter than OCR_MIN_TEXT_CHARS), with
+    # results cached on disk per page image hash
+    OCR_ENABLED: bool = True
+    OCR_LANGUAGE: str = "eng"
+    OCR_MIN_TEXT_CHARS: int = 20
+    OCR_TIMEOUT_SECONDS: float = 300.0
+    OCR_CACHE_DIR: str = ".cache/ocr"
+    OCR_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # Embedding provider: "gemini" (remote API) or "hashing" (local CPU vectors from hashed word
+    # and character n-grams, no network). Embedding caches are namespaced by provider and
+    # dimension, so changing either re-embeds documents rather than mixing vector spaces.
+    EMBEDDING_PROVIDER: str = "gemini"
+    EMBEDDING_MODEL: str = "models/text-embedding-004"
+    EMBEDDING_DIMENSION: int = 768
+    HASHING_EMBEDDING_MIN_N: int = 3
+    HASHING_EMBEDDING_MAX_N: int = 5
+
+    # Embedding scheduler (sub-batching, shared concurrency limit, retry/backoff)
+    EMBEDDING_BATCH_SIZE: int = 100
+    EMBEDDING_MAX_CONCURRENCY: int = 4
+    EMBEDDING_MAX_RETRIES: int = 4
+    EMBEDDING_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    EMBEDDING_RETRY_MAX_DELAY_SECONDS: float = 8.0
+
+    # Chunk-level embedding store (chunk text hash -> embedding), so a new document version
+    # only embeds the chunks that changed
+    EMBEDDING_STORE_ENABLED: bool = True
+    EMBEDDING_STORE_PATH: str = ".cache/embeddings.sqlite3"
+    EMBEDDING_STORE_MAX_ENTRIES: int = 1_000_000
+
+    # Vector indexes: type chosen by corpus size, persisted per document and memory-mapped on load
+    VECTOR_INDEX_STORE_ENABLED: bool = True
+    VECTOR_INDEX_DIR: str = ".cache/indexes"
+    VECTOR_INDEX_MAX_BYTES: int = 1024 * 1024 * 1024
+    VECTOR_INDEX_MMAP: bool = True
+    VECTOR_INDEX_FLAT_MAX: int = 10_000
+    VECTOR_INDEX_HNSW_MAX: int = 1_000_000
+    VECTOR_INDEX_HNSW_M: int = 32
+    VECTOR_INDEX_HNSW_EF_SEARCH: int = 64
+    VECTOR_INDEX_IVF_NPROBE: int = 16
+    # "float32" | "sq8" | "fp16" | "pq" (see index_factory.storage_mode_report for the trade-off)
+    VECTOR_STORAGE_MODE: str = "float32"
+    VECTOR_PQ_M: int = 96
+
+    # Retrieval: "vector" (FAISS only), "hybrid" (BM25 + FAISS rank fusion, with a lexical
+    # fast path that skips the query embedding), or "lexical" (BM25 only, no query embeddings)
+    RETRIEVAL_MODE: str = "hybrid"
+    LEXICAL_FAST_PATH_CONFIDENCE: float = 0.9
+    RRF_K: int = 60
+
+    # Semantic answer cache (per document, keyed by question embedding)
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    ANSWER_CACHE_MAX_ENTRIES: int = 10_000
+    ANSWER_CACHE_TTL_SECONDS: float = 24 * 60 * 60
+
+    # Questions packed into a single answer-generation prompt (1 = one LLM call per question);
+    # /run/stream uses its own size so each answer is emitted as soon as it is generated
+    ANSWER_BATCH_SIZE: int = 5
+    STREAM_ANSWER_BATCH_SIZE: int = 1
+
+    # Context packing between retrieval and prompt building. Vector hits below
+    # CONTEXT_MIN_SIMILARITY, i.e. 1 / (1 + squared L2 distance), are dropped.
+    RETRIEVAL_CANDIDATES: int = 10
+    CONTEXT_TOKEN_BUDGET: int = 2000
+    CONTEXT_MIN_SIMILARITY: float = 0.5
+    CONTEXT_DUPLICATE_THRESHOLD: float = 0.8
+
+    # Local entity parser for shorthand claim queries ("46M, knee surgery, Pune, 3-month policy");
+    # the LLM is only asked when a required field is missing or ambiguous, or confidence is low
+    ENTITY_PARSER_ENABLED: bool = True
+    ENTITY_PARSER_MIN_CONFIDENCE: float = 0.8
+
+    # Asynchronous /evaluate jobs: worker pool size, queued-job limit, and result storage
+    # ("memory" or "sqlite"; results are kept for EVALUATION_RESULT_TTL_SECONDS)
+    EVALUATION_MAX_WORKERS: int = 4
+    EVALUATION_MAX_QUEUE_DEPTH: int = 100
+    EVALUATION_RESULT_STORE: str = "memory"
+    EVALUATION_RESULT_DB: str = ".cache/evaluations.sqlite3"
+    EVALUATION_RESULT_TTL_SECONDS: float = 60 * 60
+
+    # Startup warm-up: one embedding call to open the model client's connection and a tiny
+    # FAISS build/search, so the first request doesn't pay for them. Bounded by the timeout.
+    WARMUP_ENABLED: bool = True
+    WARMUP_TIMEOUT_SECONDS: float = 10.0
+
     class Config:
         env_file = ".env"
         env_file_encoding = 'utf-8'
 
 # This creates the settings instance, loading and validating the variables.
 settings = Settings()
-
-# Debug: Print the current working directory and environment
-print("\n=== Debug: Config Loading ===")
-print(f"Current working directory: {os.getcwd()}")
-print(f"HACKRX_API_KEY: {'*' * len(settings.HACKRX_API_KEY) if settings.HACKRX_API_KEY else 'Not set'}")
-print("==========================\n")
@@ -1,8 +1,43 @@
 import os
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from .api.endpoints import evaluation, hackrx
+from .api.endpoints import evaluation, hackrx, health
+from .core.config import settings
+from .services.document_fetcher import document_fetcher
+from .services.evaluation_jobs import EvaluationJobQueue, create_result_store
+from .services.gemini_service import GeminiPolicyProcessor
+from .services.policy_eval_pipeline import PolicyEvalPipeline
+from .services.qa_service import QAService
+from .services.text_extractor import text_extractor
+from .services.warmup import warm_up
 from .utils.error_handlers import APIException, api_exception_handler
+from .utils.metrics import metrics
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared services: one model client, Q&A service, evaluation pipeline and job pool per process
+    gemini_service = GeminiPolicyProcessor()
+    pipeline = PolicyEvalPipeline(gemini_service=gemini_service)
+    app.state.qa_service = QAService(gemini_service=gemini_service)
+    app.state.evaluation_pipeline = pipeline
+    app.state.evaluation_jobs = EvaluationJobQueue(
+        store=create_result_store(),
+        runner=lambda request: evaluation.run_evaluation(request, pipeline),
+        max_workers=settings.EVALUATION_MAX_WORKERS,
+        max_queue_depth=settings.EVALUATION_MAX_QUEUE_DEPTH,
+    )
+    if settings.WARMUP_ENABLED:
+        await warm_up(gemini_service)
+
+    yield
+
+    # Stop job workers, then release pooled HTTP connections and extraction workers
+    await app.state.evaluation_jobs.aclose()
+    app.state.qa_service.close()
+    await document_fetcher.aclose()
+    text_extractor.shutdown()
 
 def create_app() -> FastAPI:
     app = FastAPI(
@@ -10,7 +45,8 @@ def create_app() -> FastAPI:
         description="An AI-powered API for answering questions about policy documents.",
         version="2.0.0",
         docs_url="/docs",
-        redoc_url="/redoc"
+        redoc_url="/redoc",
+        lifespan=lifespan
     )
 
     # CORS Middleware
@@ -22,8 +58,25 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Request metrics: latency, status counts and the rolling window behind /health
+    @app.middleware("http")
+    async def record_request_metrics(request: Request, call_next):
+        start = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            # Use the route template, not the raw URL, to keep label cardinality bounded.
+            route = request.scope.get("route")
+            path = getattr(route, "path", request.url.path if route else "unmatched")
+            metrics.observe_request(request.method, path, status_code, time.perf_counter() - start)
+
     # API Routers
+    app.include_router(evaluation.router, prefix="/v1", tags=["PolicyEval"])
     app.include_router(hackrx.router, prefix="/hackrx", tags=["Q&A"])
+    app.include_router(health.router, tags=["Health"])
 
     # Exception Handler
     app.add_exception_handler(APIException, api_exception_handler)
@@ -0,0 +1,132 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from ..core.config import settings
+
+
+class _CachedAnswer:
+    __slots__ = ("document_hash", "question_key", "vector", "answer", "created_at")
+
+    def __init__(self, document_hash: str, question_key: str, vector: Optional[np.ndarray], answer: str):
+        self.document_hash = document_hash
+        self.question_key = question_key
+        self.vector = vector
+        self.answer = answer
+        self.created_at = time.monotonic()
+
+
+class SemanticAnswerCache:
+    """
+    Per-document cache of generated answers. A question hits when its normalised text matches
+    a cached question exactly, or when its embedding's cosine similarity to a cached question
+    on the same document is at least `similarity_threshold`. Entries expire after `ttl_seconds`
+    and the least recently used entries are evicted beyond `max_entries`.
+    """
+    def __init__(self, similarity_threshold: float, max_entries: int, ttl_seconds: float):
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, _CachedAnswer]" = OrderedDict()
+        self._by_document: dict[str, list[int]] = {}
+        # Stacked, normalised embedding matrix per document, rebuilt lazily after changes.
+        self._matrices: dict[str, tuple[list[int], np.ndarray]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @staticmethod
+    def _question_key(question: str) -> str:
+        return re.sub(r"[^a-z0-9]+", " ", question.lower()).strip()
+
+    @staticmethod
+    def _normalise(embedding) -> Optional[np.ndarray]:
+        if embedding is None:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def lookup(self, document_hash: str, question: str, embedding=None) -> Optional[str]:
+        """Returns a cached answer for the question on this document, or None."""
+        question_key = self._question_key(question)
+        vector = self._normalise(embedding)
+        with self._lock:
+            self._expire(document_hash)
+            entry_ids = self._by_document.get(document_hash, [])
+
+            match = next(
+                (entry_id for entry_id in entry_ids if self._entries[entry_id].question_key == question_key),
+                None,
+            )
+            if match is None and vector is not None:
+                ids, matrix = self._document_matrix(document_hash)
+                if ids:
+                    similarities = matrix @ vector
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= self.similarity_threshold:
+                        match = ids[best]
+
+            if match is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(match)
+            return self._entries[match].answer
+
+    def store(self, document_hash: str, question: str, answer: str, embedding=None):
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _CachedAnswer(
+                document_hash, self._question_key(question), self._normalise(embedding), answer
+            )
+            self._by_document.setdefault(document_hash, []).append(entry_id)
+            self._matrices.pop(document_hash, None)
+            while len(self._entries) > self.max_entries:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+
+    def _document_matrix(self, document_hash: str) -> tuple[list[int], np.ndarray]:
+        cached = self._matrices.get(document_hash)
+        if cached is None:
+            ids = [
+                entry_id for entry_id in self._by_document.get(document_hash, [])
+                if self._entries[entry_id].vector is not None
+            ]
+            matrix = np.stack([self._entries[entry_id].vector for entry_id in ids]) if ids else np.empty((0, 0), dtype=np.float32)
+            cached = (ids, matrix)
+            self._matrices[document_hash] = cached
+        return cached
+
+    def _expire(self, document_hash: str):
+        cutoff = time.monotonic() - self.ttl_seconds
+        for entry_id in list(self._by_document.get(document_hash, [])):
+            if self._entries[entry_id].created_at < cutoff:
+                self._remove(entry_id)
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        document_ids = self._by_document[entry.document_hash]
+        document_ids.remove(entry_id)
+        if not document_ids:
+            del self._by_document[entry.document_hash]
+        self._matrices.pop(entry.document_hash, None)
+
+
+# Shared across requests so repeated questions hit regardless of which request asked first.
+answer_cache = SemanticAnswerCache(
+    similarity_threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+    max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,102 @@
+import math
+import re
+from collections import Counter
+from typing import Optional
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Function words and question words carry no lexical signal for policy lookups.
+STOPWORDS = frozenset("""
+a an and any are as at be by can do does for from has have how i if in is it its me my
+of on or our shall that the their there these this to under was we what when where
+which who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    In-process Okapi BM25 inverted index over a fixed list of chunks.
+    Postings are stored per term as parallel NumPy arrays (chunk ids, term frequencies),
+    so scoring a query is a handful of vectorized scatter-adds.
+    """
+    def __init__(self, chunks: list[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.n_docs = len(chunks)
+
+        doc_ids: dict[str, list[int]] = {}
+        term_freqs: dict[str, list[int]] = {}
+        doc_lengths = np.zeros(self.n_docs, dtype=np.float32)
+        for doc_id, chunk in enumerate(chunks):
+            tokens = tokenize(chunk)
+            doc_lengths[doc_id] = len(tokens)
+            for term, freq in Counter(tokens).items():
+                doc_ids.setdefault(term, []).append(doc_id)
+                term_freqs.setdefault(term, []).append(freq)
+
+        self.avg_doc_length = float(doc_lengths.mean()) if self.n_docs else 0.0
+        # Precompute the length normalisation term of the BM25 denominator once per chunk.
+        self._length_norm = k1 * (1 - b + b * doc_lengths / max(self.avg_doc_length, 1e-9))
+        self.postings = {
+            term: (np.asarray(ids, dtype=np.int32), np.asarray(term_freqs[term], dtype=np.float32))
+            for term, ids in doc_ids.items()
+        }
+        self.idf = {
+            term: math.log(1 + (self.n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            for term, ids in doc_ids.items()
+        }
+        # Weight used for query terms that never occur in the corpus (rarer than any seen term).
+        self._unseen_idf = math.log(1 + (self.n_docs + 0.5) / 0.5)
+
+    def score(self, query: str) -> np.ndarray:
+        """Returns the BM25 score of every chunk for `query`."""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            ids, freqs = posting
+            scores[ids] += self.idf[term] * freqs * (self.k1 + 1) / (freqs + self._length_norm[ids])
+        return scores
+
+    def search(self, query: str, top_k: int, allowed: Optional[np.ndarray] = None) -> tuple[list[tuple[int, float]], float]:
+        """
+        Returns the top-k (chunk id, score) pairs and a confidence in [0, 1]: the IDF-weighted
+        share of the query's terms that appear in the best-scoring chunk. A confidence near 1
+        means the top chunk contains every distinctive word of the question.
+        `allowed` is an optional boolean mask over chunk ids; other chunks are never returned.
+        """
+        terms = set(tokenize(query))
+        if not terms or self.n_docs == 0:
+            return [], 0.0
+
+        scores = self.score(query)
+        if allowed is not None:
+            # Only positive scores are returned, so zeroing excluded chunks removes them.
+            scores = np.where(allowed, scores, 0.0)
+        top_k = min(top_k, self.n_docs)
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        ranked = candidates[np.argsort(-scores[candidates])]
+        hits = [(int(doc_id), float(scores[doc_id])) for doc_id in ranked if scores[doc_id] > 0]
+        if not hits:
+            return [], 0.0
+
+        best = hits[0][0]
+        total_weight = 0.0
+        matched_weight = 0.0
+        for term in terms:
+            weight = self.idf.get(term, self._unseen_idf)
+            total_weight += weight
+            posting = self.postings.get(term)
+            if posting is not None:
+                ids = posting[0]
+                position = np.searchsorted(ids, best)
+                if position < len(ids) and ids[position] == best:
+                    matched_weight += weight
+        return hits, matched_weight / total_weight
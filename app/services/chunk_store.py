@@ -0,0 +1,184 @@
+import os
+from typing import Iterable, Optional
+
+import numpy as np
+
+
+def _date(value) -> np.datetime64:
+    """Day-precision date for "2023-01-01"-style values; NaT (never matches a filter) otherwise."""
+    try:
+        return np.datetime64(value, "D") if value else np.datetime64("NaT", "D")
+    except (TypeError, ValueError):
+        return np.datetime64("NaT", "D")
+
+
+class ChunkStore:
+    """
+    Columnar storage for chunk texts and their metadata. Texts are concatenated into one UTF-8
+    buffer addressed by an offsets array, and each metadata field is one NumPy array, so a
+    multi-document corpus costs a handful of arrays rather than a str and a dict per chunk,
+    and metadata filters are vectorised comparisons over those arrays.
+    """
+    # Strings shared by many chunks, stored as int32 codes into a per-field table (-1: unknown).
+    CATEGORICAL_FIELDS = ("document_id", "document", "section", "policy_type", "version")
+    # Page numbers and character offsets (-1: unknown).
+    INTEGER_FIELDS = ("page", "end_page", "start_offset", "end_offset")
+    # datetime64[D] (NaT: unknown).
+    DATE_FIELDS = ("effective_date",)
+
+    def __init__(self, texts: Iterable[str] = (), metadata: Optional[list] = None):
+        self._buffer = np.empty(0, dtype=np.uint8)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._codes = {field: np.empty(0, dtype=np.int32) for field in self.CATEGORICAL_FIELDS}
+        self._values: dict[str, list[str]] = {field: [] for field in self.CATEGORICAL_FIELDS}
+        self._value_codes: dict[str, dict[str, int]] = {field: {} for field in self.CATEGORICAL_FIELDS}
+        self._integers = {field: np.empty(0, dtype=np.int64) for field in self.INTEGER_FIELDS}
+        self._dates = {field: np.empty(0, dtype="datetime64[D]") for field in self.DATE_FIELDS}
+        self.extend(texts, metadata)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, chunk_id: int) -> str:
+        start, end = self._offsets[chunk_id], self._offsets[chunk_id + 1]
+        return self._buffer[start:end].tobytes().decode("utf-8")
+
+    def texts(self) -> list[str]:
+        """All chunk texts, decoded from a single copy of the buffer."""
+        data = self._buffer.tobytes()
+        offsets = self._offsets.tolist()
+        return [data[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+
+    @property
+    def nbytes(self) -> int:
+        columns = [*self._codes.values(), *self._integers.values(), *self._dates.values()]
+        return self._buffer.nbytes + self._offsets.nbytes + sum(column.nbytes for column in columns)
+
+    def extend(self, texts: Iterable[str], metadata: Optional[list] = None):
+        """Appends chunks; `metadata` is aligned with `texts`, with None (or missing keys) where unknown."""
+        encoded = [text.encode("utf-8") for text in texts]
+        if not encoded:
+            return
+        metadata = list(metadata) if metadata else [None] * len(encoded)
+        rows = [row or {} for row in metadata]
+
+        lengths = np.fromiter((len(data) for data in encoded), dtype=np.int64, count=len(encoded))
+        self._buffer = np.concatenate([self._buffer, np.frombuffer(b"".join(encoded), dtype=np.uint8)])
+        self._offsets = np.concatenate([self._offsets, self._offsets[-1] + np.cumsum(lengths)])
+
+        for field in self.CATEGORICAL_FIELDS:
+            codes = np.fromiter((self._code(field, row.get(field)) for row in rows), dtype=np.int32, count=len(rows))
+            self._codes[field] = np.concatenate([self._codes[field], codes])
+        for field in self.INTEGER_FIELDS:
+            values = np.fromiter(
+                (-1 if row.get(field) is None else int(row[field]) for row in rows), dtype=np.int64, count=len(rows)
+            )
+            self._integers[field] = np.concatenate([self._integers[field], values])
+        for field in self.DATE_FIELDS:
+            dates = np.array([_date(row.get(field)) for row in rows], dtype="datetime64[D]")
+            self._dates[field] = np.concatenate([self._dates[field], dates])
+
+    def _code(self, field: str, value, add: bool = True) -> int:
+        if value is None:
+            return -1
+        value = str(value)
+        code = self._value_codes[field].get(value)
+        if code is None:
+            if not add:
+                return -1
+            code = self._value_codes[field][value] = len(self._values[field])
+            self._values[field].append(value)
+        return code
+
+    def metadata(self, chunk_id: int) -> Optional[dict]:
+        """The known metadata fields of one chunk, or None if none are known."""
+        row = {}
+        for field in self.CATEGORICAL_FIELDS:
+            code = int(self._codes[field][chunk_id])
+            if code >= 0:
+                row[field] = self._values[field][code]
+        for field in self.INTEGER_FIELDS:
+            value = int(self._integers[field][chunk_id])
+            if value >= 0:
+                row[field] = value
+        for field in self.DATE_FIELDS:
+            value = self._dates[field][chunk_id]
+            if not np.isnat(value):
+                row[field] = str(value)
+        return row or None
+
+    def mask(self, filters: dict) -> np.ndarray:
+        """
+        Boolean row mask of the chunks matching every condition in `filters` (field -> condition).
+        A condition is a value (equality) or a list/set of values (membership); page, offset and
+        date fields also take a (low, high) tuple, an inclusive range where None leaves a side open.
+        Chunks with an unknown value never match. Raises ValueError for an unknown field.
+        """
+        selected = np.ones(len(self), dtype=bool)
+        for field, condition in filters.items():
+            selected &= self._field_mask(field, condition)
+        return selected
+
+    def _field_mask(self, field: str, condition) -> np.ndarray:
+        if field in self._codes:
+            codes = self._codes[field]
+            if isinstance(condition, (list, set, frozenset)):
+                wanted = [code for code in (self._code(field, value, add=False) for value in condition) if code >= 0]
+                return np.isin(codes, wanted)
+            code = self._code(field, condition, add=False)
+            return codes == code if code >= 0 else np.zeros(len(codes), dtype=bool)
+
+        if field in self._integers:
+            column, convert, known = self._integers[field], int, self._integers[field] >= 0
+        elif field in self._dates:
+            column, convert, known = self._dates[field], _date, ~np.isnat(self._dates[field])
+        else:
+            raise ValueError(f"Unknown chunk metadata field: {field!r}")
+
+        if isinstance(condition, tuple):
+            low, high = condition
+            selected = known.copy()
+            if low is not None:
+                selected &= column >= convert(low)
+            if high is not None:
+                selected &= column <= convert(high)
+            return selected
+        if isinstance(condition, (list, set, frozenset)):
+            return known & np.isin(column, np.array([convert(value) for value in condition], dtype=column.dtype))
+        return known & (column == convert(condition))
+
+    def _arrays(self) -> dict[str, np.ndarray]:
+        arrays = {"buffer": self._buffer, "offsets": self._offsets}
+        for field in self.CATEGORICAL_FIELDS:
+            arrays[field] = self._codes[field]
+            arrays[f"{field}.values"] = np.array(self._values[field], dtype=str)
+        arrays.update(self._integers)
+        arrays.update(self._dates)
+        return arrays
+
+    def save(self, directory: str, prefix: str = "chunks"):
+        """Writes one .npy file per array, so `load` can memory-map them."""
+        for name, array in self._arrays().items():
+            np.save(os.path.join(directory, f"{prefix}.{name}.npy"), array, allow_pickle=False)
+
+    @classmethod
+    def load(cls, directory: str, prefix: str = "chunks", mmap: bool = True) -> "ChunkStore":
+        """Loads a store written by `save`; arrays are memory-mapped (read-only) unless mmap is False."""
+        def read(name: str) -> np.ndarray:
+            path = os.path.join(directory, f"{prefix}.{name}.npy")
+            return np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+
+        store = cls()
+        store._buffer = read("buffer")
+        store._offsets = read("offsets")
+        for field in cls.CATEGORICAL_FIELDS:
+            store._codes[field] = read(field)
+            store._values[field] = read(f"{field}.values").tolist()
+            store._value_codes[field] = {value: code for code, value in enumerate(store._values[field])}
+        for field in cls.INTEGER_FIELDS:
+            store._integers[field] = read(field)
+        for field in cls.DATE_FIELDS:
+            store._dates[field] = read(field)
+        if any(len(column) != len(store) for column in [*store._codes.values(), *store._integers.values(), *store._dates.values()]):
+            raise ValueError("Persisted chunk metadata does not match the persisted chunks.")
+        return store
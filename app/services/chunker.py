@@ -0,0 +1,204 @@
+import re
+from bisect import bisect_right
+from collections import deque
+from typing import Iterator, Optional
+
+# Rough tokens-per-character ratio for English policy text (~4 characters per token).
+CHARS_PER_TOKEN = 4
+
+# A unit ends after sentence punctuation, at a blank line, or right before a line that may be a
+# numbered/upper-case section heading; `_is_heading` decides whether that last kind really is one.
+BOUNDARY_PATTERN = re.compile(
+    r"(?<=[.!?;:])\s+(?=\S)"
+    r"|\n[ \t]*\n\s*"
+    r"|(?P<line_break>\n)(?=[ \t]*(?:\d|[A-Z][A-Z0-9 ,&/()-]{3,}\n))"
+)
+# A whole heading line: a numbered label followed by title-like text ("4.2 Exclusions",
+# "1. COVERAGE"), or an upper-case line ("SECTION C - BENEFITS"). Not a sentence: no trailing
+# full stop or comma, so numbered clauses ("5. The insurer shall pay.") are body text.
+HEADING_LINE_PATTERN = re.compile(
+    r"[ \t]*(?:\d+(?:\.\d+)*[.)]?[ \t]+[A-Z][^\n]*?|[A-Z][A-Z0-9 ,&/()-]{3,}?)(?<![.,;])[ \t]*"
+)
+# Lines longer than this are body text, however they start.
+HEADING_MAX_CHARS = 80
+TERMINAL_PUNCTUATION = ".!?:;"
+HORIZONTAL_SPACE = re.compile(r"[ \t\f\v\r]+")
+SPACE_AROUND_NEWLINES = re.compile(r" ?\n ?")
+EXCESS_NEWLINES = re.compile(r"\n\s*\n\s*")
+# After `normalize_page`, whitespace runs are " ", "\n" or "\n\n", so consecutive units (and
+# chunks) are separated by at most this many characters.
+MAX_WHITESPACE_RUN = 2
+
+
+def estimate_tokens(text_length: int) -> int:
+    return max(1, text_length // CHARS_PER_TOKEN)
+
+
+def normalize_page(text: str) -> str:
+    """Collapses runs of spaces while keeping line and paragraph breaks, which mark structure."""
+    text = HORIZONTAL_SPACE.sub(" ", text)
+    text = SPACE_AROUND_NEWLINES.sub("\n", text)
+    text = EXCESS_NEWLINES.sub("\n\n", text)
+    return text.strip()
+
+
+class Chunk:
+    """
+    A chunk of document text with its provenance: source document, pages, character offsets and
+    the heading of the section it starts in (None before the first heading).
+    """
+    __slots__ = ("text", "document", "page", "end_page", "start_offset", "end_offset", "token_count", "section")
+
+    def __init__(self, text: str, document: str, page: int, end_page: int, start_offset: int, end_offset: int, token_count: int,
+                 section: Optional[str] = None):
+        self.text = text
+        self.document = document
+        self.page = page
+        self.end_page = end_page
+        self.start_offset = start_offset
+        self.end_offset = end_offset
+        self.token_count = token_count
+        self.section = section
+
+    def to_metadata(self) -> dict:
+        return {
+            "document": self.document,
+            "section": self.section,
+            "page": self.page,
+            "end_page": self.end_page,
+            "start_offset": self.start_offset,
+            "end_offset": self.end_offset,
+        }
+
+
+def _line_at(text: str, start: int) -> str:
+    end = text.find("\n", start)
+    return text[start:end if end >= 0 else len(text)]
+
+
+def _is_heading(text: str, start: int) -> bool:
+    """
+    True when the line starting at `start` is a standalone section heading: a short heading-shaped
+    line that follows the end of a sentence (or a blank line, or another heading) and is not
+    continued by the next line. PDF text is hard-wrapped, so a line merely starting with a number
+    ("36 months of continuous coverage") is usually the middle of a sentence.
+    """
+    line_start = text.rfind("\n", 0, start) + 1
+    if text[line_start:start].strip():
+        return False
+    line = _line_at(text, start)
+    if len(line.strip()) > HEADING_MAX_CHARS or not HEADING_LINE_PATTERN.fullmatch(line):
+        return False
+
+    before = text[:line_start].rstrip(" \t")
+    if before and not before.endswith("\n\n"):
+        previous_start = before.rfind("\n", 0, len(before) - 1) + 1
+        previous = before[previous_start:].strip()
+        if previous[-1:] not in TERMINAL_PUNCTUATION and not (
+            len(previous) <= HEADING_MAX_CHARS and HEADING_LINE_PATTERN.fullmatch(previous)
+        ):
+            return False
+
+    following = text[start + len(line) + 1:].lstrip(" \t")
+    return not following[:1].islower()
+
+
+def _units(text: str, max_unit_chars: int) -> Iterator[tuple[int, int, bool]]:
+    """
+    Yields (start, end, starts_section) spans of sentences/paragraphs in `text`.
+    Spans longer than `max_unit_chars` (tables, run-on lists) are split at whitespace.
+    """
+    start = 0
+    for boundary in BOUNDARY_PATTERN.finditer(text):
+        if boundary.group("line_break") and not _is_heading(text, boundary.end()):
+            # A wrapped line, not a heading: the sentence continues.
+            continue
+        if boundary.start() > start:
+            yield from _split_long(text, start, boundary.start(), max_unit_chars)
+        start = boundary.end()
+    if start < len(text):
+        yield from _split_long(text, start, len(text), max_unit_chars)
+
+
+def _split_long(text: str, start: int, end: int, max_unit_chars: int) -> Iterator[tuple[int, int, bool]]:
+    starts_section = _is_heading(text, start)
+    while end - start > max_unit_chars:
+        cut = text.rfind(" ", start, start + max_unit_chars)
+        if cut <= start:
+            cut = start + max_unit_chars
+        yield start, cut, starts_section
+        starts_section = False
+        start = cut + 1 if text[cut:cut + 1] == " " else cut
+    if end > start:
+        yield start, end, starts_section
+
+
+def chunk_pages(pages: list[str], max_tokens: int, overlap_tokens: int, document: str = "", page_separator: str = "\n\n") -> list[Chunk]:
+    """
+    Splits page texts into chunks of at most ~`max_tokens` estimated tokens on sentence and
+    section boundaries, with ~`overlap_tokens` of trailing sentences repeated at the start of
+    the next chunk. Section headings start a new chunk once the current one is a quarter full.
+
+    Runs in a single pass over the joined text: units are tracked as offsets and each chunk's
+    text is one slice of the document, so no per-chunk word lists are built or re-joined.
+    Offsets refer to the normalised document (pages joined with `page_separator`); pages are 1-based.
+    """
+    normalized = [normalize_page(page) for page in pages]
+    page_starts = []
+    position = 0
+    for page in normalized:
+        page_starts.append(position)
+        position += len(page) + len(page_separator)
+    text = page_separator.join(normalized)
+
+    def page_of(offset: int) -> int:
+        return bisect_right(page_starts, offset)
+
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks: list[Chunk] = []
+    window: deque[tuple[int, int, int]] = deque()  # (start, end, tokens) of units in the current chunk
+    window_tokens = 0
+    # Start offsets and labels of the section headings seen so far, in document order.
+    section_starts: list[int] = []
+    section_labels: list[str] = []
+
+    def section_of(offset: int) -> Optional[str]:
+        position = bisect_right(section_starts, offset)
+        return section_labels[position - 1] if position else None
+
+    def emit():
+        chunk_start, chunk_end = window[0][0], window[-1][1]
+        chunks.append(Chunk(
+            text=text[chunk_start:chunk_end],
+            document=document,
+            page=page_of(chunk_start),
+            end_page=page_of(chunk_end - 1),
+            start_offset=chunk_start,
+            end_offset=chunk_end,
+            token_count=window_tokens,
+            section=section_of(chunk_start),
+        ))
+
+    for start, end, starts_section in _units(text, max_chars):
+        if starts_section:
+            section_starts.append(start)
+            # The heading's whole line: a numbered heading's unit can end early ("1." is a sentence).
+            section_labels.append(_line_at(text, start).strip())
+        tokens = estimate_tokens(end - start)
+        over_budget = window and window_tokens + tokens > max_tokens
+        section_break = window and starts_section and window_tokens >= max_tokens // 4
+        if over_budget or section_break:
+            emit()
+            # Carry trailing units into the next chunk as overlap, but never across a section break.
+            if section_break:
+                window.clear()
+                window_tokens = 0
+            while window and (window_tokens > overlap_tokens or window_tokens + tokens > max_tokens):
+                window_tokens -= window.popleft()[2]
+        window.append((start, end, tokens))
+        window_tokens += tokens
+
+    # The tail always ends with a unit no earlier chunk contains, so it is always emitted.
+    if window:
+        emit()
+    return chunks
@@ -0,0 +1,112 @@
+import re
+
+from .chunker import CHARS_PER_TOKEN, MAX_WHITESPACE_RUN, estimate_tokens
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _similarity(distance: float) -> float:
+    """Maps a squared L2 distance to a similarity in (0, 1]; for unit vectors 0.5 means cosine 0.5."""
+    return 1.0 / (1.0 + max(distance, 0.0))
+
+
+def _merge_adjacent(results: list[dict]) -> list[dict]:
+    """
+    Merges hits from the same document whose character ranges overlap, touch or are separated only
+    by the whitespace the chunker trims between chunks (at most MAX_WHITESPACE_RUN characters), so
+    neighbouring chunk windows are sent, and budgeted, once; a whitespace gap becomes a single
+    newline. The merged entry keeps the best rank. Documents are told apart
+    by `document_id` (content hash or request position), not by file name, which two versions
+    of a policy can share; hits without a document id or offsets are passed through unchanged.
+    """
+    merged = []
+    by_document: dict[str, list[tuple[int, dict]]] = {}
+    for rank, result in enumerate(results):
+        metadata = result.get('metadata') or {}
+        if metadata.get('document_id') is None or metadata.get('start_offset') is None or metadata.get('end_offset') is None:
+            merged.append((rank, result))
+        else:
+            by_document.setdefault(metadata['document_id'], []).append((rank, result))
+
+    for hits in by_document.values():
+        hits.sort(key=lambda hit: hit[1]['metadata']['start_offset'])
+        current_rank, current = hits[0]
+        for rank, hit in hits[1:]:
+            current_meta, hit_meta = current['metadata'], hit['metadata']
+            gap = hit_meta['start_offset'] - current_meta['end_offset']
+            if gap > MAX_WHITESPACE_RUN:
+                # The text in between was not retrieved, so these stay separate passages.
+                merged.append((current_rank, current))
+                current_rank, current = rank, hit
+                continue
+            if hit_meta['end_offset'] > current_meta['end_offset']:
+                # Chunk text is an exact slice of the document, so the overlap can be cut precisely.
+                joined = current['text'] + "\n" + hit['text'] if gap > 0 else current['text'] + hit['text'][-gap:]
+                current = {
+                    **current,
+                    'text': joined,
+                    'metadata': {
+                        **current_meta,
+                        'end_offset': hit_meta['end_offset'],
+                        'end_page': hit_meta.get('end_page', current_meta.get('end_page')),
+                    },
+                }
+            current_rank = min(current_rank, rank)
+        merged.append((current_rank, current))
+
+    merged.sort(key=lambda entry: entry[0])
+    return [result for _, result in merged]
+
+
+def pack_context(
+    results: list[dict],
+    token_budget: int,
+    lower_is_better: bool = False,
+    min_similarity: float = 0.5,
+    duplicate_threshold: float = 0.8,
+) -> list[dict]:
+    """
+    Turns ranked search results into the context sent to the LLM:
+    1. for L2 distance scores (`lower_is_better`), drops results whose similarity 1 / (1 + d)
+       is below `min_similarity` (instead of a fixed top_k). Higher-is-better scores (BM25, rank
+       fusion) have no absolute scale, so they are not cut on score,
+    2. merges overlapping or touching chunks from the same document,
+    3. drops near-duplicates (word-trigram Jaccard similarity >= `duplicate_threshold`),
+    4. keeps results in rank order until `token_budget` estimated tokens are used.
+    The best result is always kept, truncated to the budget if it alone exceeds it.
+    Returns result dicts ('text' plus 'metadata' when known), best first.
+    """
+    if not results:
+        return []
+
+    candidates = results
+    if lower_is_better:
+        candidates = [results[0]] + [result for result in results[1:] if _similarity(result['score']) >= min_similarity]
+    candidates = _merge_adjacent(candidates)
+
+    packed = []
+    kept_shingles = []
+    used_tokens = 0
+    for result in candidates:
+        shingles = _shingles(result['text'])
+        if any(len(shingles & kept) / len(shingles | kept) >= duplicate_threshold for kept in kept_shingles):
+            continue
+
+        tokens = estimate_tokens(len(result['text']))
+        if used_tokens + tokens > token_budget:
+            if packed:
+                break
+            result = {**result, 'text': result['text'][:token_budget * CHARS_PER_TOKEN]}
+            tokens = token_budget
+
+        packed.append(result)
+        kept_shingles.append(shingles)
+        used_tokens += tokens
+    return packed
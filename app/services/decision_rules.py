@@ -0,0 +1,168 @@
+import re
+from typing import Optional
+
+# Reported as processing_metadata.business_rules_version; bump when the rules change.
+RULES_VERSION = "v3"
+
+# Clauses the analysis scored below this relevance do not take part in the decision.
+MIN_CLAUSE_RELEVANCE = 0.5
+
+
+# "5,00,000", "2.5", "5.5 lakh", "INR 2.5L", "1 crore"; currency words and symbols around it are ignored.
+AMOUNT_PATTERN = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*(lakhs?|lacs?|l|crores?|cr|k|thousand|million|mn)?\b", re.IGNORECASE)
+AMOUNT_MULTIPLIERS = {
+    "lakh": 100_000, "lakhs": 100_000, "lac": 100_000, "lacs": 100_000, "l": 100_000,
+    "crore": 10_000_000, "crores": 10_000_000, "cr": 10_000_000,
+    "k": 1_000, "thousand": 1_000, "million": 1_000_000, "mn": 1_000_000,
+}
+
+
+def _as_int(value) -> Optional[int]:
+    """
+    LLM output may carry numbers as strings ("24", "24 months", "Rs. 5,00,000", "5.5 lakh");
+    anything without a number is None. Thousands separators are dropped, Indian lakh/crore
+    units are applied, and only a real decimal fraction is truncated.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        match = AMOUNT_PATTERN.search(value)
+        if not match:
+            return None
+        number = float(match.group(1).replace(",", ""))
+        unit = (match.group(2) or "").lower()
+        return int(number * AMOUNT_MULTIPLIERS.get(unit, 1))
+    return None
+
+
+def _as_float(value, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _as_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "1")
+    return bool(value)
+
+
+def _risk(factor: str, severity: str, impact: str, description: str) -> dict:
+    return {"factor": factor, "severity": severity, "impact_on_decision": impact, "description": description}
+
+
+def _recommendation(kind: str, priority: str, message: str) -> dict:
+    return {"type": kind, "priority": priority, "message": message}
+
+
+def evaluate_decision(query: dict, analyzed_clauses: list) -> dict:
+    """
+    Applies the claim decision rules to the structured output of `analyze_policy_clauses`,
+    in priority order:
+    1. a relevant exclusion clause rejects the claim;
+    2. a waiting period longer than the policy duration rejects it;
+    3. a pre-existing condition hit by an exclusion or condition clause rejects it;
+    4. otherwise at least one inclusion clause approves it, up to its coverage amount;
+    5. anything else (including an unknown policy duration) requires review.
+    Returns the decision, confidence, approved/maximum amounts, waiting-period status,
+    risk level, risk factors, recommendations and the reasoning for the rule that fired.
+    """
+    clauses = [
+        clause for clause in (analyzed_clauses if isinstance(analyzed_clauses, list) else [])
+        if isinstance(clause, dict) and _as_float(clause.get("relevance_score"), 1.0) >= MIN_CLAUSE_RELEVANCE
+    ]
+    by_type: dict[str, list[dict]] = {}
+    for clause in clauses:
+        by_type.setdefault(str(clause.get("clause_type", "general")).lower(), []).append(clause)
+    exclusions = by_type.get("exclusion", [])
+    inclusions = by_type.get("inclusion", [])
+    conditions = by_type.get("condition", [])
+
+    def rules(clause: dict) -> dict:
+        extracted = clause.get("extracted_rules")
+        return extracted if isinstance(extracted, dict) else {}
+
+    def confidence(matched: list[dict]) -> float:
+        return round(0.5 + 0.5 * max(_as_float(clause.get("relevance_score"), 0.5) for clause in matched), 3)
+
+    policy_months = _as_int(query.get("policy_duration_months"))
+    required_months = max(
+        (months for months in (_as_int(rules(clause).get("waiting_period_months")) for clause in inclusions + conditions) if months),
+        default=0,
+    )
+    maximum_eligible = max(
+        (amount for amount in (_as_int(rules(clause).get("coverage_amount")) for clause in inclusions) if amount),
+        default=0,
+    )
+    waiting_period = {
+        "required_months": required_months,
+        "elapsed_months": policy_months or 0,
+        "status": "met" if not required_months or (policy_months is not None and policy_months >= required_months) else "not_met",
+    }
+
+    risk_factors, recommendations = [], []
+    decision, score, reasoning = "requires_review", 0.3, ""
+
+    pre_existing_clauses = [
+        clause for clause in exclusions + conditions if _as_bool(rules(clause).get("pre_existing_condition_clause"))
+    ]
+    if exclusions:
+        decision, score = "rejected", confidence(exclusions)
+        clause_ids = ", ".join(str(clause.get("clause_id", "N/A")) for clause in exclusions)
+        reasoning = f"Rule 1 (exclusion priority): exclusion clause(s) {clause_ids} apply to this claim."
+        risk_factors.append(_risk("Exclusion clause applied", "high", "negative", reasoning))
+    elif required_months and policy_months is not None and policy_months < required_months:
+        decision, score = "rejected", 0.95
+        reasoning = (
+            f"Rule 2 (waiting period): the policy has run {policy_months} months, "
+            f"short of the required {required_months}-month waiting period."
+        )
+        risk_factors.append(_risk("Waiting period not met", "high", "negative", reasoning))
+    elif _as_bool(query.get("pre_existing")) and pre_existing_clauses:
+        decision, score = "rejected", confidence(pre_existing_clauses)
+        reasoning = "Rule 3 (pre-existing conditions): a relevant clause restricts cover for pre-existing conditions."
+        risk_factors.append(_risk("Pre-existing condition", "high", "negative", reasoning))
+    elif required_months and policy_months is None:
+        reasoning = (
+            f"Rule 5 (review): a {required_months}-month waiting period applies, "
+            "but the policy duration is unknown."
+        )
+        risk_factors.append(_risk("Policy duration unknown", "medium", "neutral", reasoning))
+        recommendations.append(_recommendation("information_request", "high", "Confirm how long the policy has been in force."))
+    elif inclusions:
+        decision, score = "approved", confidence(inclusions)
+        clause_ids = ", ".join(str(clause.get("clause_id", "N/A")) for clause in inclusions)
+        reasoning = f"Rule 4 (approval): inclusion clause(s) {clause_ids} cover the claim and no exclusion or unmet condition applies."
+    else:
+        reasoning = "Rule 5 (review): no relevant inclusion or exclusion clause was found for this claim."
+        risk_factors.append(_risk("Insufficient policy evidence", "medium", "neutral", reasoning))
+        recommendations.append(_recommendation("manual_review", "medium", "Check the full policy wording for this procedure."))
+
+    if required_months and waiting_period["status"] == "met":
+        risk_factors.append(_risk(
+            "Waiting period met", "low", "positive",
+            f"The {required_months}-month waiting period has elapsed.",
+        ))
+    if _as_bool(query.get("pre_existing")) and decision != "rejected":
+        risk_factors.append(_risk(
+            "Pre-existing condition declared", "medium", "neutral",
+            "No clause restricting pre-existing conditions was found among the relevant clauses.",
+        ))
+
+    severities = {factor["severity"] for factor in risk_factors if factor["impact_on_decision"] != "positive"}
+    risk_level = "high" if "high" in severities else "medium" if "medium" in severities else "low"
+
+    return {
+        "decision": decision,
+        "confidence_score": score,
+        "approved_amount": maximum_eligible if decision == "approved" else 0,
+        "maximum_eligible": maximum_eligible,
+        "waiting_period": waiting_period,
+        "risk_level": risk_level,
+        "risk_factors": risk_factors,
+        "recommendations": recommendations,
+        "reasoning": reasoning,
+    }
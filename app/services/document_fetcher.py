@@ -0,0 +1,156 @@
+import asyncio
+import base64
+import hashlib
+import tempfile
+from typing import Optional
+
+import httpx
+
+from ..core.config import settings
+
+
+class DocumentTooLargeError(ValueError):
+    """Raised when a document exceeds the configured download size limit."""
+
+
+class FetchedDocument:
+    """
+    A downloaded document spooled to memory (small bodies) or a temporary file (large bodies).
+    The SHA-256 of the bytes is computed while streaming, so callers never need the full body in memory.
+    """
+    def __init__(self, stream, size: int, content_hash: str, validators: Optional[dict] = None):
+        self.stream = stream
+        self.size = size
+        self.content_hash = content_hash
+        self.validators = validators or {}
+
+    def close(self):
+        self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class DocumentFetcher:
+    """
+    Non-blocking document downloader backed by a single pooled `httpx.AsyncClient`.
+    The client keeps connections alive per host, so repeated downloads from the same
+    blob store reuse TCP/TLS sessions instead of reconnecting on every request.
+    """
+    CHUNK_BYTES = 64 * 1024
+
+    def __init__(
+        self,
+        max_bytes: int,
+        spool_threshold: int,
+        timeout: float,
+        max_connections: int,
+        max_keepalive_connections: int,
+    ):
+        self.max_bytes = max_bytes
+        self.spool_threshold = spool_threshold
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_lock = asyncio.Lock()
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        # The client is created lazily so it binds to the running event loop.
+        if self._client is None or self._client.is_closed:
+            async with self._client_lock:
+                if self._client is None or self._client.is_closed:
+                    self._client = httpx.AsyncClient(
+                        limits=self.limits,
+                        timeout=self.timeout,
+                        follow_redirects=True,
+                    )
+        return self._client
+
+    async def fetch(self, content: str) -> FetchedDocument:
+        """Fetches a document from a URL, or decodes it from a Base64 string."""
+        if content.startswith(('http://', 'https://')):
+            return await self._download(content)
+
+        data = base64.b64decode(content)
+        if len(data) > self.max_bytes:
+            raise DocumentTooLargeError(
+                f"Document is {len(data)} bytes, exceeding the {self.max_bytes} byte limit."
+            )
+        stream = self._new_spool()
+        stream.write(data)
+        stream.seek(0)
+        return FetchedDocument(stream, len(data), hashlib.sha256(data).hexdigest())
+
+    async def fetch_validators(self, url: str) -> dict:
+        """Issues a HEAD request to read a URL's cache validators without downloading the body."""
+        client = await self._get_client()
+        try:
+            response = await client.head(url)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            return {}
+        return self._validators(response.headers)
+
+    async def _download(self, url: str) -> FetchedDocument:
+        client = await self._get_client()
+        stream = self._new_spool()
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with client.stream("GET", url) as response:
+                response.raise_for_status()
+
+                declared_length = response.headers.get("Content-Length")
+                if declared_length and declared_length.isdigit() and int(declared_length) > self.max_bytes:
+                    raise DocumentTooLargeError(
+                        f"Document is {declared_length} bytes, exceeding the {self.max_bytes} byte limit."
+                    )
+
+                async for block in response.aiter_bytes(self.CHUNK_BYTES):
+                    size += len(block)
+                    if size > self.max_bytes:
+                        raise DocumentTooLargeError(
+                            f"Document exceeds the {self.max_bytes} byte limit."
+                        )
+                    digest.update(block)
+                    stream.write(block)
+
+                validators = self._validators(response.headers)
+        except BaseException:
+            stream.close()
+            raise
+
+        stream.seek(0)
+        return FetchedDocument(stream, size, digest.hexdigest(), validators)
+
+    def _new_spool(self):
+        # Bodies below the threshold stay in memory; larger ones roll over to a temp file on disk.
+        return tempfile.SpooledTemporaryFile(max_size=self.spool_threshold, mode="w+b")
+
+    @staticmethod
+    def _validators(headers) -> dict:
+        return {
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+        }
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Shared across all requests so connection pools are reused.
+document_fetcher = DocumentFetcher(
+    max_bytes=settings.DOCUMENT_MAX_BYTES,
+    spool_threshold=settings.DOCUMENT_SPOOL_THRESHOLD_BYTES,
+    timeout=settings.DOCUMENT_FETCH_TIMEOUT_SECONDS,
+    max_connections=settings.HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+)
@@ -1,20 +1,26 @@
 import base64
-import requests
-import re
 from io import BytesIO
-from pypdf import PdfReader
-import docx
+from typing import BinaryIO
+from .chunker import Chunk, chunk_pages, normalize_page
+from .document_fetcher import FetchedDocument, document_fetcher
+from .text_extractor import text_extractor
+from ..utils.lazy_import import lazy_import
+from ..utils.metrics import metrics
+
+requests = lazy_import("requests")
+pypdf = lazy_import("pypdf")
+docx = lazy_import("docx")
 
 class DocumentProcessor:
     CHUNK_SIZE = 500  # tokens
     CHUNK_OVERLAP = 50 # tokens
+    # Bump whenever chunk boundaries or chunk metadata change, so cached chunks/embeddings are not reused.
+    CHUNKER_VERSION = 5
 
     def process_document(self, document: dict) -> list[str]:
         """Orchestrates the document processing pipeline for a single document."""
         content = document.get('content')
-        # The new schema passes metadata with filename info
-        metadata = document.get('metadata', {})
-        filename = metadata.get('filename', '') # Assuming filename is passed in metadata
+        filename = self.filename_for(document)
 
         with self._get_content_stream(content) as stream:
             text = self._extract_text(stream, filename)
@@ -22,6 +28,51 @@ class DocumentProcessor:
             chunks = self._chunk_text(cleaned_text)
             return chunks
 
+    async def process_document_async(self, document: dict) -> list[Chunk]:
+        """
+        Like `process_document`, but downloads without blocking the event loop and returns
+        chunks with page and offset provenance.
+        """
+        filename = self.filename_for(document)
+
+        with metrics.time_stage("download"):
+            fetched = await self.fetch_document(document.get('content'))
+        with fetched:
+            return await self.process_stream(fetched.stream, filename)
+
+    @staticmethod
+    def filename_for(document: dict) -> str:
+        """
+        Returns the document's filename: metadata['filename'] when given, otherwise the last
+        path segment of a URL. The extension decides how text is extracted.
+        """
+        metadata = document.get('metadata') or {}
+        if metadata.get('filename'):
+            return metadata['filename']
+        content = document.get('content') or ''
+        if content.startswith(('http://', 'https://')):
+            return content.split('/')[-1].split('?')[0]
+        return ''
+
+    async def fetch_document(self, content: str) -> FetchedDocument:
+        """Fetches a document from a URL or Base64 string through the shared pooled fetcher."""
+        return await document_fetcher.fetch(content)
+
+    async def fetch_validators(self, url: str) -> dict:
+        """Reads a URL's ETag/Last-Modified validators without downloading the body."""
+        return await document_fetcher.fetch_validators(url)
+
+    async def process_stream(self, stream: BinaryIO, filename: str) -> list[Chunk]:
+        """
+        Runs extraction and chunking over an already-fetched document stream.
+        Extraction runs on the shared process pool, off the event loop thread; pages are kept
+        separate so every chunk records the page it came from.
+        """
+        with metrics.time_stage("extract"):
+            pages = await text_extractor.extract_pages(stream, filename)
+        with metrics.time_stage("chunk"):
+            return chunk_pages(pages, self.CHUNK_SIZE, self.CHUNK_OVERLAP, document=filename)
+
     def _get_content_stream(self, content: str) -> BytesIO:
         """Retrieves content as a stream from a URL or a Base64 string."""
         if content.startswith(('http://', 'https://')):
@@ -34,15 +85,14 @@ class DocumentProcessor:
             decoded_content = base64.b64decode(content)
             return BytesIO(decoded_content)
 
-    def _extract_text(self, content_stream: BytesIO, filename: str) -> str:
+    def _extract_text(self, content_stream: BinaryIO, filename: str) -> str:
         """Extracts text from a document stream based on its filename extension."""
         file_ext = filename.split('.')[-1].lower() if '.' in filename else ''
 
         text = ""
         if file_ext == 'pdf':
-            reader = PdfReader(content_stream)
-            for page in reader.pages:
-                text += page.extract_text() or ""
+            reader = pypdf.PdfReader(content_stream)
+            text = "".join(page.extract_text() or "" for page in reader.pages)
         elif file_ext == 'docx':
             doc = docx.Document(content_stream)
             text = "\n".join(para.text for para in doc.paragraphs)
@@ -52,21 +102,9 @@ class DocumentProcessor:
         return text
 
     def _clean_text(self, text: str) -> str:
-        """Cleans and normalizes the extracted text."""
-        text = text.strip()
-        text = re.sub(r'\s+', ' ', text)  # Replace multiple whitespace chars with a single space
-        text = re.sub(r'(\n)+', '\n', text) # Replace multiple newlines with a single one
-        return text
+        """Cleans and normalizes the extracted text, keeping line and paragraph breaks."""
+        return normalize_page(text)
 
     def _chunk_text(self, text: str) -> list[str]:
-        """Splits text into semantic chunks based on word count."""
-        words = text.split()
-        if not words:
-            return []
-
-        chunks = []
-        for i in range(0, len(words), self.CHUNK_SIZE - self.CHUNK_OVERLAP):
-            chunk_words = words[i:i + self.CHUNK_SIZE]
-            chunks.append(" ".join(chunk_words))
-        
-        return chunks
+        """Splits text into chunks of ~CHUNK_SIZE tokens on sentence and section boundaries."""
+        return [chunk.text for chunk in chunk_pages([text], self.CHUNK_SIZE, self.CHUNK_OVERLAP)]
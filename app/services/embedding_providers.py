@@ -0,0 +1,96 @@
+import asyncio
+import re
+import zlib
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+import numpy as np
+
+from ..core.config import settings
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class EmbeddingProvider(ABC):
+    """
+    Turns text into fixed-size vectors. `name` identifies the model and dimension; it namespaces
+    every embedding cache, so vectors from different providers are never mixed.
+    """
+    name: str
+    dimension: int
+
+    @abstractmethod
+    async def embed(self, text: str, task_type: str = "retrieval_document"):
+        """One vector for `text`."""
+
+    @abstractmethod
+    async def embed_batch(self, texts: list[str], task_type: str = "retrieval_document"):
+        """One vector per text, in order: a list of vectors or an (n, dimension) matrix."""
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Local CPU embeddings with no model file and no network: each word and each of its character
+    n-grams is hashed (CRC32) to a signed bucket, and the bucket counts are L2-normalised. Similar
+    wording, including inflections and typos, lands on overlapping buckets, which is enough for
+    retrieval over policy text when a remote embedding API is unavailable or too slow.
+
+    A batch is embedded in a worker thread as one scatter-add (`np.bincount`) into an
+    (n, dimension) matrix; each distinct word's buckets are hashed once and memoised.
+    """
+    def __init__(self, dimension: int, min_n: int = 3, max_n: int = 5, cache_size: int = 100_000):
+        self.dimension = dimension
+        self.min_n = min_n
+        self.max_n = max_n
+        self.name = f"hashing-{min_n}-{max_n}:{dimension}"
+        self._token_buckets = lru_cache(maxsize=cache_size)(self._hash_token)
+
+    def _hash_token(self, token: str) -> tuple[np.ndarray, np.ndarray]:
+        padded = f"<{token}>"
+        features = [token] + [
+            padded[start:start + n]
+            for n in range(self.min_n, self.max_n + 1)
+            for start in range(len(padded) - n + 1)
+        ]
+        hashes = np.fromiter((zlib.crc32(feature.encode("utf-8")) for feature in features), dtype=np.uint32, count=len(features))
+        # The low bits pick the bucket, the top bit the sign, so collisions tend to cancel out.
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        return (hashes % self.dimension).astype(np.int64), signs
+
+    def embed_matrix(self, texts: list[str]) -> np.ndarray:
+        """Returns the (n, dimension) float32 embedding matrix for `texts`."""
+        columns, weights, lengths = [], [], []
+        for text in texts:
+            buckets = [self._token_buckets(token) for token in TOKEN_PATTERN.findall(text.lower())]
+            lengths.append(sum(len(token_columns) for token_columns, _ in buckets))
+            for token_columns, token_signs in buckets:
+                columns.append(token_columns)
+                weights.append(token_signs)
+        if not columns:
+            return np.zeros((len(texts), self.dimension), dtype=np.float32)
+
+        rows = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+        flat_index = rows * self.dimension + np.concatenate(columns)
+        matrix = np.bincount(
+            flat_index, weights=np.concatenate(weights), minlength=len(texts) * self.dimension
+        ).astype(np.float32).reshape(len(texts), self.dimension)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, np.float32(1e-12))
+
+    async def embed(self, text: str, task_type: str = "retrieval_document") -> np.ndarray:
+        return self.embed_matrix([text])[0]
+
+    async def embed_batch(self, texts: list[str], task_type: str = "retrieval_document") -> np.ndarray:
+        return await asyncio.to_thread(self.embed_matrix, texts)
+
+
+def create_embedding_provider() -> EmbeddingProvider:
+    if settings.EMBEDDING_PROVIDER == "hashing":
+        return HashingEmbeddingProvider(
+            settings.EMBEDDING_DIMENSION, settings.HASHING_EMBEDDING_MIN_N, settings.HASHING_EMBEDDING_MAX_N
+        )
+    if settings.EMBEDDING_PROVIDER == "gemini":
+        # Imported here: gemini_service depends on this module for the provider interface.
+        from .gemini_service import GeminiEmbeddingProvider
+        return GeminiEmbeddingProvider(settings.EMBEDDING_MODEL, settings.EMBEDDING_DIMENSION)
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER: {settings.EMBEDDING_PROVIDER!r}")
@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+
+from ..core.config import settings
+
+
+class EmbeddingStore:
+    """
+    Persistent map from chunk text to its embedding, keyed by a SHA-256 of the chunk text (within
+    a namespace naming the embedding model). Documents that share chunks, such as successive
+    versions of the same policy, only pay to embed the chunks that are new.
+    Least-recently-used rows are evicted beyond `max_entries`.
+    """
+    # SQLite limits the number of bound parameters per statement.
+    QUERY_BATCH_SIZE = 500
+
+    def __init__(self, path: str, max_entries: int, namespace: str = "default"):
+        self.max_entries = max_entries
+        self.namespace = namespace
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_embeddings ("
+            " chunk_hash TEXT PRIMARY KEY, embedding BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS chunk_embeddings_last_access ON chunk_embeddings (last_access)"
+        )
+        self._lock = threading.Lock()
+        # Kept up to date on insert and eviction, so writes never count the whole table.
+        (self._count,) = self._connection.execute("SELECT COUNT(*) FROM chunk_embeddings").fetchone()
+
+    def chunk_hash(self, text: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, chunk_hashes: list[str]) -> dict[str, np.ndarray]:
+        """Returns the stored embeddings for whichever of `chunk_hashes` are present."""
+        found = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(chunk_hashes), self.QUERY_BATCH_SIZE):
+                batch = chunk_hashes[start:start + self.QUERY_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT chunk_hash, embedding FROM chunk_embeddings WHERE chunk_hash IN ({placeholders})", batch
+                ).fetchall()
+                for chunk_hash, blob in rows:
+                    found[chunk_hash] = np.frombuffer(blob, dtype=np.float32)
+                if rows:
+                    self._connection.execute(
+                        f"UPDATE chunk_embeddings SET last_access = ? WHERE chunk_hash IN ({placeholders})", [now, *batch]
+                    )
+        return found
+
+    def put_many(self, embeddings: dict[str, np.ndarray]):
+        """Stores new embeddings; a chunk hash already present keeps its (identical) vector."""
+        now = time.time()
+        rows = [
+            (chunk_hash, np.ascontiguousarray(vector, dtype=np.float32).tobytes(), now)
+            for chunk_hash, vector in embeddings.items()
+        ]
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                inserted = self._connection.executemany(
+                    "INSERT OR IGNORE INTO chunk_embeddings (chunk_hash, embedding, last_access) VALUES (?, ?, ?)", rows
+                ).rowcount
+                self._count += max(inserted, 0)
+                self._evict()
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                # Re-read rather than guess how much of the transaction had been counted.
+                (self._count,) = self._connection.execute("SELECT COUNT(*) FROM chunk_embeddings").fetchone()
+                raise
+
+    async def embed(self, texts: list[str], embed_batch: Callable[[list[str]], Awaitable[list]],
+                    stats: Optional[dict] = None) -> np.ndarray:
+        """
+        Returns an (n, dimension) float32 matrix for `texts`, calling `embed_batch` only for
+        chunks not already stored (each distinct text once) and storing the new vectors.
+        SQLite work runs in a worker thread, off the event loop.
+
+        If given, `stats["lookups"]` and `stats["hits"]` are incremented by the number of texts
+        and the number served from the store, so callers can report their own hit ratio.
+        """
+        chunk_hashes = [self.chunk_hash(text) for text in texts]
+        stored = await asyncio.to_thread(self.get_many, list(dict.fromkeys(chunk_hashes)))
+        if stats is not None:
+            stats["lookups"] = stats.get("lookups", 0) + len(chunk_hashes)
+            stats["hits"] = stats.get("hits", 0) + sum(chunk_hash in stored for chunk_hash in chunk_hashes)
+
+        missing = {}
+        for chunk_hash, text in zip(chunk_hashes, texts):
+            if chunk_hash not in stored:
+                missing.setdefault(chunk_hash, text)
+        if missing:
+            new_vectors = await embed_batch(list(missing.values()))
+            new_embeddings = {
+                chunk_hash: np.asarray(vector, dtype=np.float32) for chunk_hash, vector in zip(missing, new_vectors)
+            }
+            await asyncio.to_thread(self.put_many, new_embeddings)
+            stored.update(new_embeddings)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([stored[chunk_hash] for chunk_hash in chunk_hashes])
+
+    def _evict(self):
+        if self._count > self.max_entries:
+            deleted = self._connection.execute(
+                "DELETE FROM chunk_embeddings WHERE chunk_hash IN"
+                " (SELECT chunk_hash FROM chunk_embeddings ORDER BY last_access LIMIT ?)",
+                (self._count - self.max_entries,),
+            ).rowcount
+            self._count -= deleted
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def create_embedding_store(namespace: str) -> Optional[EmbeddingStore]:
+    if not settings.EMBEDDING_STORE_ENABLED:
+        return None
+    return EmbeddingStore(settings.EMBEDDING_STORE_PATH, settings.EMBEDDING_STORE_MAX_ENTRIES, namespace=namespace)
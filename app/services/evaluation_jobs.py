@@ -0,0 +1,214 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from ..core.config import settings
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its depth limit."""
+
+
+class JobRecord:
+    __slots__ = ("task_id", "status", "result", "error", "created_at", "updated_at")
+
+    def __init__(self, task_id: str, status: str, result: Optional[dict] = None, error: Optional[str] = None,
+                 created_at: Optional[float] = None, updated_at: Optional[float] = None):
+        now = time.time()
+        self.task_id = task_id
+        self.status = status
+        self.result = result
+        self.error = error
+        self.created_at = created_at if created_at is not None else now
+        self.updated_at = updated_at if updated_at is not None else now
+
+
+class ResultStore(ABC):
+    """
+    Where job status and results live between submission and polling. Implementations must be
+    safe to call from the event loop; records older than `ttl_seconds` may be dropped.
+    """
+    @abstractmethod
+    def create(self, task_id: str):
+        """Records a new job as queued."""
+
+    @abstractmethod
+    def update(self, task_id: str, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        """Sets a job's status, and its result or error once it has finished."""
+
+    @abstractmethod
+    def get(self, task_id: str) -> Optional[JobRecord]:
+        """The job's record, or None if it is unknown or expired."""
+
+    def close(self):
+        pass
+
+
+class InMemoryResultStore(ResultStore):
+    """Process-local store; results are lost on restart and not shared between workers."""
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._records: "OrderedDict[str, JobRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, task_id: str):
+        with self._lock:
+            self._expire()
+            self._records[task_id] = JobRecord(task_id, QUEUED)
+
+    def update(self, task_id: str, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        with self._lock:
+            record = self._records.get(task_id)
+            if record is None:
+                return
+            record.status, record.result, record.error = status, result, error
+            record.updated_at = time.time()
+
+    def get(self, task_id: str) -> Optional[JobRecord]:
+        with self._lock:
+            self._expire()
+            return self._records.get(task_id)
+
+    def _expire(self):
+        # Records are kept in creation order, so expired ones are always at the front.
+        cutoff = time.time() - self.ttl_seconds
+        while self._records:
+            task_id, record = next(iter(self._records.items()))
+            if record.created_at >= cutoff:
+                break
+            del self._records[task_id]
+
+
+class SQLiteResultStore(ResultStore):
+    """
+    SQLite-backed store, so results survive restarts and can be polled through any process
+    sharing the database file. Rows hold small JSON documents, so calls are made inline.
+    """
+    def __init__(self, path: str, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS evaluation_jobs ("
+            " task_id TEXT PRIMARY KEY, status TEXT NOT NULL, result TEXT, error TEXT,"
+            " created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS evaluation_jobs_created_at ON evaluation_jobs (created_at)"
+        )
+        self._lock = threading.Lock()
+
+    def create(self, task_id: str):
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM evaluation_jobs WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+            self._connection.execute(
+                "INSERT INTO evaluation_jobs (task_id, status, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (task_id, QUEUED, now, now),
+            )
+
+    def update(self, task_id: str, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        with self._lock:
+            self._connection.execute(
+                "UPDATE evaluation_jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE task_id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), task_id),
+            )
+
+    def get(self, task_id: str) -> Optional[JobRecord]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT status, result, error, created_at, updated_at FROM evaluation_jobs"
+                " WHERE task_id = ? AND created_at >= ?",
+                (task_id, time.time() - self.ttl_seconds),
+            ).fetchone()
+        if row is None:
+            return None
+        status, result, error, created_at, updated_at = row
+        return JobRecord(task_id, status, json.loads(result) if result else None, error, created_at, updated_at)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def create_result_store() -> ResultStore:
+    if settings.EVALUATION_RESULT_STORE == "sqlite":
+        return SQLiteResultStore(settings.EVALUATION_RESULT_DB, settings.EVALUATION_RESULT_TTL_SECONDS)
+    if settings.EVALUATION_RESULT_STORE == "memory":
+        return InMemoryResultStore(settings.EVALUATION_RESULT_TTL_SECONDS)
+    raise ValueError(f"Unknown EVALUATION_RESULT_STORE: {settings.EVALUATION_RESULT_STORE!r}")
+
+
+class EvaluationJobQueue:
+    """
+    In-process job queue: `submit` records the job and returns its id at once, and up to
+    `max_workers` worker tasks run `runner(payload)` in the background, writing the result
+    (or the error message) to the result store. At most `max_queue_depth` jobs may wait;
+    beyond that `submit` raises QueueFullError so callers can shed load.
+    """
+    def __init__(self, store: ResultStore, runner: Callable[[Any], Awaitable[dict]], max_workers: int, max_queue_depth: int):
+        self.store = store
+        self.runner = runner
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _start(self):
+        # Workers are started on first use so they belong to the serving event loop.
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_depth)
+            self._workers = [asyncio.ensure_future(self._work()) for _ in range(self.max_workers)]
+
+    def submit(self, payload: Any) -> str:
+        self._start()
+        if self._queue.full():
+            raise QueueFullError(f"{self.max_queue_depth} evaluations already queued")
+        task_id = str(uuid.uuid4())
+        self.store.create(task_id)
+        self._queue.put_nowait((task_id, payload))
+        return task_id
+
+    async def _work(self):
+        while True:
+            task_id, payload = await self._queue.get()
+            try:
+                self.store.update(task_id, RUNNING)
+                result = await self.runner(payload)
+                self.store.update(task_id, COMPLETED, result=result)
+            except asyncio.CancelledError:
+                self.store.update(task_id, FAILED, error="Evaluation was cancelled by a server shutdown")
+                raise
+            except Exception as e:
+                self.store.update(task_id, FAILED, error=str(e))
+            finally:
+                self._queue.task_done()
+
+    async def aclose(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        self.store.close()
@@ -1,15 +1,120 @@
-import google.generativeai as genai
 from ..core.config import settings
+from ..utils.lazy_import import lazy_import
+from ..utils.metrics import metrics
+from .embedding_providers import EmbeddingProvider, create_embedding_provider
+import asyncio
 import json
+import random
 import re
+from functools import lru_cache
+from typing import Awaitable, Callable
+
+# The Gemini SDK takes most of the app's import time, so it loads on first use.
+genai = lazy_import("google.generativeai")
+
+# Prefix of the fallback answer returned when generation fails; such answers must not be cached.
+ANSWER_ERROR_PREFIX = "Error generating response"
+
+# Answer rules shared by the single-question and batched answer prompts.
+ANSWER_INSTRUCTIONS = """INSTRUCTIONS:
+1. Answer in 1-3 complete, grammatically correct sentences.
+2. Be precise and avoid vague language (no "might be" or "could be").
+3. Include only the most relevant policy terms and conditions.
+4. Format numbers and dates consistently (e.g., "thirty (30) days").
+5. If information is not found in the context, state: "This information is not specified in the provided policy document.\""""
+
+@lru_cache(maxsize=None)
+def transient_errors() -> tuple:
+    """Errors worth retrying: rate limiting, overload and timeouts. Anything else fails fast."""
+    google_exceptions = lazy_import("google.api_core.exceptions")
+    return (
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.InternalServerError,
+        asyncio.TimeoutError,
+        ConnectionError,
+    )
+
+class EmbeddingScheduler:
+    """
+    Splits embedding inputs into sub-batches, runs them under a semaphore shared by every
+    request in the process, retries transient failures with jittered exponential backoff,
+    and reassembles the results in input order.
+    """
+    def __init__(self, batch_size: int, max_concurrency: int, max_retries: int, base_delay: float, max_delay: float):
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def embed(self, texts: list[str], embed_batch: Callable[[list[str]], Awaitable[list]]) -> list:
+        """Embeds `texts` with `embed_batch`, one call per sub-batch, preserving order."""
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        results = await asyncio.gather(*[self.call(embed_batch, batch) for batch in batches])
+        return [embedding for batch_result in results for embedding in batch_result]
+
+    async def call(self, fn: Callable[..., Awaitable], *args):
+        """Runs a single embedding call under the shared semaphore with retry/backoff."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    return await fn(*args)
+            except transient_errors():
+                if attempt == self.max_retries:
+                    raise
+            # "Full jitter" backoff, slept outside the semaphore so waiting calls don't hold a slot.
+            delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+            await asyncio.sleep(random.uniform(0, delay))
+
+# Shared across requests so the provider sees a bounded number of in-flight calls per worker.
+embedding_scheduler = EmbeddingScheduler(
+    batch_size=settings.EMBEDDING_BATCH_SIZE,
+    max_concurrency=settings.EMBEDDING_MAX_CONCURRENCY,
+    max_retries=settings.EMBEDDING_MAX_RETRIES,
+    base_delay=settings.EMBEDDING_RETRY_BASE_DELAY_SECONDS,
+    max_delay=settings.EMBEDDING_RETRY_MAX_DELAY_SECONDS,
+)
+
+
+class GeminiEmbeddingProvider(EmbeddingProvider):
+    """Gemini embedding API, called through the shared scheduler (sub-batching, concurrency limit, retries)."""
+    def __init__(self, model: str, dimension: int):
+        self.model = model
+        self.dimension = dimension
+        self.name = f"{model}:{dimension}"
+
+    async def embed(self, text: str, task_type: str = "retrieval_document") -> list:
+        return await embedding_scheduler.call(self._embed_content, text, task_type)
+
+    async def embed_batch(self, texts: list[str], task_type: str = "retrieval_document") -> list:
+        return await embedding_scheduler.embed(texts, lambda batch: self._embed_content(batch, task_type))
+
+    async def _embed_content(self, content, task_type: str) -> list:
+        response = await genai.embed_content_async(
+            model=self.model,
+            content=content,
+            task_type=task_type,
+            output_dimensionality=self.dimension,
+        )
+        return response['embedding']
+
 
 class GeminiPolicyProcessor:
-    def __init__(self):
+    def __init__(self, embedding_provider: EmbeddingProvider = None):
         if not settings.GEMINI_API_KEY:
             raise ValueError("GEMINI_API_KEY not found in environment variables.")
         genai.configure(api_key=settings.GEMINI_API_KEY)
         self.model = genai.GenerativeModel('gemini-2.5-flash')
-        self.embedding_model = 'models/text-embedding-004'
+        self.embedding_provider = embedding_provider or create_embedding_provider()
+        # Namespaces the ingestion cache, index store and embedding store.
+        self.embedding_model = self.embedding_provider.name
+
+    async def _generate_content(self, prompt: str, generation_config: dict = None):
+        """Single entry point for LLM calls, so every generation is timed the same way."""
+        with metrics.time_stage("llm_generation"):
+            return await self.model.generate_content_async(prompt, generation_config=generation_config)
 
     def _parse_json_response(self, text: str) -> dict:
         """Safely parse JSON from a string that might contain markdown."""
@@ -43,7 +148,7 @@ class GeminiPolicyProcessor:
         Only extract explicitly mentioned information. Use null for missing data.
         Format the output as a JSON object inside a '```json' markdown block.
         """
-        response = await self.model.generate_content_async(prompt)
+        response = await self._generate_content(prompt)
         return self._parse_json_response(response.text)
     
     async def analyze_policy_clauses(self, query: dict, document_chunks: list) -> list:
@@ -53,11 +158,12 @@ class GeminiPolicyProcessor:
 
         Query: {json.dumps(query)}
 
-        Policy Sections:
-        {json.dumps(document_chunks)}
+        Policy Sections (numbered from 0):
+        {json.dumps(dict(enumerate(document_chunks)))}
 
         For each relevant section, return a JSON array of objects with the following structure:
         [{{
+            "source_index": "integer, the number of the policy section the clause comes from",
             "clause_id": "A unique reference or the first 10 words of the clause",
             "relevance_score": "A float from 0 to 1 indicating relevance to the query",
             "clause_type": "'inclusion' (provides coverage), 'exclusion' (denies coverage), 'condition' (a prerequisite), or 'general'",
@@ -80,55 +186,46 @@ class GeminiPolicyProcessor:
         
         Format the output as a JSON object inside a '```json' markdown block.
         """
-        response = await self.model.generate_content_async(prompt)
+        response = await self._generate_content(prompt)
         return self._parse_json_response(response.text)
     
     async def generate_embeddings(self, text: str, task_type="retrieval_document") -> list:
-        """Generate embeddings using Gemini's embedding capabilities"""
-        response = await genai.embed_content_async(
-            model=self.embedding_model,
-            content=text,
-            task_type=task_type
-        )
-        return response['embedding']
+        """Generate an embedding with the configured embedding provider"""
+        with metrics.time_stage("embed"):
+            return await self.embedding_provider.embed(text, task_type)
 
     async def generate_embeddings_batch(self, texts: list[str], task_type="retrieval_document") -> list:
-        """Generate embeddings for a batch of texts for improved efficiency."""
-        response = await genai.embed_content_async(
-            model=self.embedding_model,
-            content=texts,
-            task_type=task_type
-        )
-        return response['embedding']
+        """
+        Generate embeddings for a batch of texts: a list of vectors, or an (n, dimension)
+        matrix from local providers. The Gemini provider splits large inputs into sub-batches
+        that respect its batch limit and are retried independently.
+        """
+        if not texts:
+            return []
+        with metrics.time_stage("embed"):
+            return await self.embedding_provider.embed_batch(texts, task_type)
         
-    async def final_decision_reasoning(self, query: dict, analyzed_clauses: list) -> dict:
-        """Generate final decision with detailed reasoning"""
+    async def review_narrative(self, query: dict, analyzed_clauses: list, decision: dict) -> dict:
+        """
+        Explains a `requires_review` decision made by the local rules engine for the human
+        reviewer. The decision itself is never changed here.
+        """
         prompt = f"""
-        Make a final insurance claim decision based on the query and the policy analysis, following a strict set of rules.
+        An insurance claim could not be decided automatically and needs manual review.
 
         Query: {json.dumps(query)}
         Policy Analysis: {json.dumps(analyzed_clauses)}
-
-        **Decision-Making Rules (MUST be followed in this order):**
-        1.  **Exclusion Priority**: If any relevant clause is an 'exclusion', the decision MUST be 'rejected', regardless of other clauses.
-        2.  **Waiting Period Validation**: Check if a waiting period is required. If the policy duration in the query is less than the required waiting period, the decision MUST be 'rejected'.
-        3.  **Pre-existing Conditions**: If the query mentions a pre-existing condition and a relevant clause excludes it, the decision MUST be 'rejected'.
-        4.  **Approval Logic**: If no exclusions or unmet conditions apply, and there is at least one 'inclusion' clause, the decision is 'approved'.
-        5.  **Review Required**: If the information is insufficient to make a clear decision, the status is 'requires_review'.
+        Automated rule outcome: {json.dumps(decision.get("reasoning"))}
 
         Return a single JSON object with the following structure:
         {{
-            "decision": "'approved' | 'rejected' | 'requires_review'",
-            "confidence_score": "A float from 0 to 1, reflecting certainty in the decision",
-            "approved_amount": "The final approved amount as an integer, or 0 if rejected",
-            "reasoning": "A detailed, step-by-step explanation for the decision, explicitly referencing the rules applied.",
-            "risk_factors": ["A list of identified risk factors, if any, such as 'Exclusion clause applied' or 'Waiting period not met'"],
-            "recommendations": ["A list of recommendations, e.g., 'request more documents for clarity on pre-existing condition'"]
+            "reasoning": "A short explanation of why the claim cannot be decided from the available information.",
+            "recommendations": ["Specific information or documents the reviewer should obtain"]
         }}
 
-        Be conservative and justify every decision by citing the rule that was triggered. Format the output as a JSON object inside a '```json' markdown block.
+        Do not decide the claim. Format the output as a JSON object inside a '```json' markdown block.
         """
-        response = await self.model.generate_content_async(prompt)
+        response = await self._generate_content(prompt)
         return self._parse_json_response(response.text)
 
     async def generate_answer_from_context(self, question: str, context_chunks: list[str]) -> str:
@@ -140,12 +237,7 @@ class GeminiPolicyProcessor:
         context_text = "\n".join(context_chunks)
         prompt = f"""You are an expert insurance policy analyst. Provide a clear, direct answer to the question based EXCLUSIVELY on the provided policy document context.
 
-INSTRUCTIONS:
-1. Answer in 1-3 complete, grammatically correct sentences.
-2. Be precise and avoid vague language (no "might be" or "could be").
-3. Include only the most relevant policy terms and conditions.
-4. Format numbers and dates consistently (e.g., "thirty (30) days").
-5. If information is not found in the context, state: "This information is not specified in the provided policy document."
+{ANSWER_INSTRUCTIONS}
 
 Question: {question}
 
@@ -157,7 +249,7 @@ Policy Document Context:
 Provide a direct, concise answer without section headers or formatting. Only include information that is explicitly stated in the context."""
         
         try:
-            response = await self.model.generate_content_async(
+            response = await self._generate_content(
                 prompt,
                 generation_config={
                     "temperature": 0.2,
@@ -170,4 +262,70 @@ Provide a direct, concise answer without section headers or formatting. Only inc
             answer = re.sub(r'\[.*?\]\s*', '', answer)  # Remove any [Section] headers
             return answer
         except Exception as e:
-            return f"Error generating response: {str(e)}"
+            return f"{ANSWER_ERROR_PREFIX}: {str(e)}"
+
+    async def generate_answers_batch(self, questions: list[str], contexts: list[list[str]]) -> list[str]:
+        """Answers several questions in one LLM call over the union of their retrieved chunks.
+
+        Each chunk is sent once even when several questions retrieved it. The model returns a
+        JSON array of answers; any question whose answer is missing or unparseable falls back
+        to an individual `generate_answer_from_context` call.
+
+        Returns:
+            list[str]: One answer per question, in input order.
+        """
+        if len(questions) == 1:
+            return [await self.generate_answer_from_context(questions[0], contexts[0])]
+
+        # Deduplicate the context across questions while preserving retrieval order.
+        unique_chunks = list(dict.fromkeys(chunk for chunks in contexts for chunk in chunks))
+        context_text = "\n\n".join(f"[{i + 1}] {chunk}" for i, chunk in enumerate(unique_chunks))
+        questions_text = "\n".join(f"{i + 1}. {question}" for i, question in enumerate(questions))
+
+        prompt = f"""You are an expert insurance policy analyst. Answer each question below based EXCLUSIVELY on the provided policy document context.
+
+{ANSWER_INSTRUCTIONS}
+6. Do not cite the bracketed passage numbers in your answers.
+
+Questions:
+{questions_text}
+
+Policy Document Context:
+---
+{context_text}
+---
+
+Return a JSON array with exactly one object per question, in order:
+[{{"question_number": 1, "answer": "..."}}]
+Format the output as a JSON array inside a '```json' markdown block."""
+
+        answers = [None] * len(questions)
+        try:
+            response = await self._generate_content(
+                prompt,
+                generation_config={
+                    "temperature": 0.2,
+                    "top_p": 0.8,
+                    "max_output_tokens": 512 * len(questions),
+                }
+            )
+            parsed = self._parse_json_response(response.text)
+            if isinstance(parsed, list):
+                for item in parsed:
+                    if not isinstance(item, dict):
+                        continue
+                    number = item.get("question_number")
+                    answer = item.get("answer")
+                    if isinstance(number, int) and 1 <= number <= len(questions) and isinstance(answer, str) and answer.strip():
+                        answers[number - 1] = re.sub(r'\[.*?\]\s*', '', answer.strip())
+        except Exception as e:
+            print(f"Warning: Batched answer generation failed, falling back to per-question calls: {e}")
+
+        missing = [i for i, answer in enumerate(answers) if answer is None]
+        if missing:
+            fallback = await asyncio.gather(*[
+                self.generate_answer_from_context(questions[i], contexts[i]) for i in missing
+            ])
+            for i, answer in zip(missing, fallback):
+                answers[i] = answer
+        return answers
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+
+class IngestionCache:
+    """
+    Disk-backed cache of processed documents (chunks + float32 embedding matrix).
+
+    Entries are keyed by the SHA-256 of the raw document bytes. A URL index keyed
+    by URL plus ETag/Last-Modified lets a repeat request skip the download entirely.
+    Entries are evicted least-recently-used first once the total size on disk
+    exceeds `max_bytes`. Access times are only updated in memory on a hit; they reach
+    index.json with the next write (put, eviction, URL update) or `flush`.
+    """
+    INDEX_FILE = "index.json"
+    CHUNKS_FILE = "chunks.json"
+    METADATA_FILE = "metadata.json"
+    EMBEDDINGS_FILE = "embeddings.npy"
+
+    def __init__(self, root_dir: str, max_bytes: int, namespace: str = "default"):
+        # Each namespace (embedding model + chunking parameters) gets its own directory,
+        # so changing either never serves stale vectors.
+        namespace_digest = hashlib.sha256(namespace.encode("utf-8")).hexdigest()[:16]
+        self.root_dir = os.path.join(root_dir, namespace_digest)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.root_dir, exist_ok=True)
+        self._index = self._load_index()
+        self._access_dirty = False
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        """Returns the content address for a document's raw bytes."""
+        return hashlib.sha256(data).hexdigest()
+
+    def lookup_url(self, url: str, etag: Optional[str], last_modified: Optional[str]) -> Optional[str]:
+        """
+        Returns the content hash previously stored for this URL if its validators still match.
+        Without at least one validator there is nothing to compare, so the lookup misses.
+        """
+        if not etag and not last_modified:
+            return None
+        with self._lock:
+            record = self._index["urls"].get(url)
+            if not record:
+                return None
+            if record.get("etag") != etag or record.get("last_modified") != last_modified:
+                return None
+            content_hash = record["content_hash"]
+            return content_hash if content_hash in self._index["entries"] else None
+
+    def content_hash_for_url(self, url: str) -> Optional[str]:
+        """
+        Returns the content hash last stored for this URL regardless of validators, i.e. the
+        previous version of a document whose URL now serves different bytes.
+        """
+        with self._lock:
+            record = self._index["urls"].get(url)
+            if not record or record["content_hash"] not in self._index["entries"]:
+                return None
+            return record["content_hash"]
+
+    def get(self, content_hash: str) -> Optional[tuple[list[str], np.ndarray, Optional[list[dict]]]]:
+        """Returns (chunks, embeddings, chunk metadata) for a content hash, or None on a miss."""
+        with self._lock:
+            entry = self._index["entries"].get(content_hash)
+            if entry is None:
+                return None
+            entry_dir = self._entry_dir(content_hash)
+            try:
+                with open(os.path.join(entry_dir, self.CHUNKS_FILE), "r", encoding="utf-8") as f:
+                    chunks = json.load(f)
+                embeddings = np.load(os.path.join(entry_dir, self.EMBEDDINGS_FILE))
+                metadata = None
+                metadata_path = os.path.join(entry_dir, self.METADATA_FILE)
+                if os.path.exists(metadata_path):
+                    with open(metadata_path, "r", encoding="utf-8") as f:
+                        metadata = json.load(f)
+            except (OSError, ValueError):
+                # A partially deleted or corrupted entry is treated as a miss and dropped.
+                self._remove_entry(content_hash)
+                self._save_index()
+                return None
+
+            entry["last_access"] = time.time()
+            self._access_dirty = True
+            return chunks, embeddings, metadata
+
+    def put(
+        self,
+        content_hash: str,
+        chunks: list[str],
+        embeddings,
+        metadata: Optional[list[dict]] = None,
+        url: Optional[str] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ):
+        """Stores a processed document and, optionally, the URL validators that produced it."""
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != len(chunks):
+            raise ValueError("Embeddings must be a 2-D matrix with one row per chunk.")
+
+        with self._lock:
+            entry_dir = self._entry_dir(content_hash)
+            # Write into a temporary directory first so readers never see a half-written entry.
+            tmp_dir = tempfile.mkdtemp(dir=self.root_dir, prefix=".tmp-")
+            try:
+                with open(os.path.join(tmp_dir, self.CHUNKS_FILE), "w", encoding="utf-8") as f:
+                    json.dump(chunks, f)
+                np.save(os.path.join(tmp_dir, self.EMBEDDINGS_FILE), matrix)
+                if metadata is not None:
+                    with open(os.path.join(tmp_dir, self.METADATA_FILE), "w", encoding="utf-8") as f:
+                        json.dump(metadata, f)
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                os.replace(tmp_dir, entry_dir)
+            except Exception:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                raise
+
+            self._index["entries"][content_hash] = {
+                "size": self._dir_size(entry_dir),
+                "last_access": time.time(),
+            }
+            if url:
+                self._index["urls"][url] = {
+                    "content_hash": content_hash,
+                    "etag": etag,
+                    "last_modified": last_modified,
+                }
+            self._evict()
+            self._save_index()
+
+    def remember_url(self, url: str, content_hash: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Points a URL at an existing entry, e.g. when the same bytes are served from a new URL."""
+        with self._lock:
+            if content_hash not in self._index["entries"]:
+                return
+            self._index["urls"][url] = {
+                "content_hash": content_hash,
+                "etag": etag,
+                "last_modified": last_modified,
+            }
+            self._save_index()
+
+    def flush(self):
+        """Persists access times recorded since the last index write."""
+        with self._lock:
+            if self._access_dirty:
+                self._save_index()
+
+    def _evict(self):
+        """Drops least-recently-used entries until the cache fits within max_bytes."""
+        entries = self._index["entries"]
+        total = sum(entry["size"] for entry in entries.values())
+        for content_hash in sorted(entries, key=lambda h: entries[h]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            total -= entries[content_hash]["size"]
+            self._remove_entry(content_hash)
+
+    def _remove_entry(self, content_hash: str):
+        self._index["entries"].pop(content_hash, None)
+        self._index["urls"] = {
+            url: record for url, record in self._index["urls"].items()
+            if record["content_hash"] != content_hash
+        }
+        shutil.rmtree(self._entry_dir(content_hash), ignore_errors=True)
+
+    def _entry_dir(self, content_hash: str) -> str:
+        return os.path.join(self.root_dir, content_hash)
+
+    @staticmethod
+    def _dir_size(path: str) -> int:
+        return sum(
+            os.path.getsize(os.path.join(path, name))
+            for name in os.listdir(path)
+        )
+
+    def _load_index(self) -> dict:
+        index_path = os.path.join(self.root_dir, self.INDEX_FILE)
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if "entries" in index and "urls" in index:
+                return index
+        except (OSError, ValueError):
+            pass
+        return {"entries": {}, "urls": {}}
+
+    def _save_index(self):
+        index_path = os.path.join(self.root_dir, self.INDEX_FILE)
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, index_path)
+        self._access_dirty = False
@@ -0,0 +1,82 @@
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Optional
+
+
+class OcrCache:
+    """
+    Disk cache of OCR output keyed by the SHA-256 of a page's image data, so a scanned page is
+    recognised once no matter which document (or document version) it appears in. One text file
+    per page; least-recently-read files are evicted once the total exceeds `max_bytes`.
+    """
+    def __init__(self, root_dir: str, max_bytes: int, namespace: str = "default"):
+        # OCR output depends on the language model and engine settings, so each gets a namespace.
+        namespace_digest = hashlib.sha256(namespace.encode("utf-8")).hexdigest()[:16]
+        self.root_dir = os.path.join(root_dir, namespace_digest)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, page_hash: str) -> str:
+        return os.path.join(self.root_dir, f"{page_hash}.txt")
+
+    def get(self, page_hash: str) -> Optional[str]:
+        path = self._path(page_hash)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            return None
+        # The file mtime doubles as the LRU timestamp.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return text
+
+    def get_many(self, page_hashes: list[str]) -> dict[str, str]:
+        """Cached text for each page hash that has one."""
+        found = {}
+        for page_hash in page_hashes:
+            text = self.get(page_hash)
+            if text is not None:
+                found[page_hash] = text
+        return found
+
+    def put(self, page_hash: str, text: str):
+        self.put_many({page_hash: text})
+
+    def put_many(self, texts: dict[str, str]):
+        """Stores OCR text by page hash, evicting once for the whole batch."""
+        with self._lock:
+            os.makedirs(self.root_dir, exist_ok=True)
+            for page_hash, text in texts.items():
+                fd, tmp_path = tempfile.mkstemp(dir=self.root_dir, prefix=".tmp-")
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        f.write(text)
+                    os.replace(tmp_path, self._path(page_hash))
+                except Exception:
+                    os.unlink(tmp_path)
+                    raise
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.root_dir):
+            if name.startswith(".tmp-"):
+                continue
+            path = os.path.join(self.root_dir, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue  # already removed by another worker
+            total -= size
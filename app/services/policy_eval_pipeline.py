@@ -1,9 +1,29 @@
+from ..core.config import settings
+from ..utils.metrics import metrics
+from ..utils.task_graph import TaskGraph
+from .context_packer import pack_context
+from .decision_rules import evaluate_decision
 from .document_processor import DocumentProcessor
+from .embedding_store import create_embedding_store
 from .gemini_service import GeminiPolicyProcessor as GeminiService
+from .query_parser import is_confident, parse_query
 from .vector_store_service import VectorStoreService
+import asyncio
 import traceback
+from typing import Optional
+
+
+class _NoDocumentContent(Exception):
+    """Raised inside the graph when no document yielded any chunks."""
+
 
 class PolicyEvalPipeline:
+    def __init__(self, gemini_service: GeminiService = None, document_processor: DocumentProcessor = None):
+        # Both are stateless across requests, so one pipeline is shared by the whole app.
+        self.gemini_service = gemini_service or GeminiService()
+        self.document_processor = document_processor or DocumentProcessor()
+        self.embedding_store = create_embedding_store(self.gemini_service.embedding_model)
+
     async def process_request(self, request_data: dict):
         """
         Runs the end-to-end evaluation pipeline asynchronously.
@@ -32,55 +52,172 @@ class PolicyEvalPipeline:
         
         combined_query = ". ".join(combined_query_parts)
 
-        # 1. Initialize services for this request
-        doc_processor = DocumentProcessor()
-        gemini_service = GeminiService()
-        vector_store = VectorStoreService(dimension=768)
-
-        try:
-            # 2. Extract structured entities from the query
-            extracted_entities = await gemini_service.extract_entities(combined_query)
-
-            # 3. Process all documents to get text chunks
-            all_chunks = []
-            for doc in documents:
-                try:
-                    # The document format now includes metadata
-                    chunks = doc_processor.process_document(doc)
-                    all_chunks.extend(chunks)
-                except Exception as e:
-                    print(f"Error processing document: {doc.get('filename', 'unknown')}")
-                    traceback.print_exc()
-                    pass
+        # 1. Per-request state; the services themselves are shared
+        doc_processor = self.document_processor
+        gemini_service = self.gemini_service
+        document_status = {"processed": 0, "failed": 0}
+        embedding_cache_stats = {"lookups": 0, "hits": 0}
 
+        async def process_documents():
+            # Every document is fetched, extracted and embedded independently; one bad document
+            # only removes its own chunks from the evaluation.
+            outcomes = await asyncio.gather(
+                *[self._process_document(doc, embedding_cache_stats) for doc in documents],
+                return_exceptions=True,
+            )
+            all_chunks, all_embeddings, all_metadata = [], [], []
+            for position, (doc, outcome) in enumerate(zip(documents, outcomes)):
+                if isinstance(outcome, BaseException):
+                    document_status["failed"] += 1
+                    print(f"Error processing document: {doc_processor.filename_for(doc) or 'unknown'}")
+                    traceback.print_exception(type(outcome), outcome, outcome.__traceback__)
+                    continue
+                chunks, embeddings = outcome
+                document_status["processed"] += 1
+                all_chunks.extend(chunks)
+                all_embeddings.extend(embeddings)
+                # Policy metadata and the document's position in the request go on every chunk, for
+                # filtering search results and for telling same-named documents apart.
+                policy_fields = {**self._policy_fields(doc), "document_id": str(position)}
+                all_metadata.extend({**chunk.to_metadata(), **policy_fields} for chunk in chunks)
             if not all_chunks:
-                return {"error": "No content could be extracted from the provided documents."}
+                raise _NoDocumentContent()
+            return all_chunks, all_embeddings, all_metadata
 
-            # 4. Generate embeddings for all chunks in a single batch for efficiency
-            embeddings = await gemini_service.generate_embeddings_batch(all_chunks)
-            documents_to_add = [{'text': chunk, 'embedding': emb} for chunk, emb in zip(all_chunks, embeddings)]
-            vector_store.add_documents(documents_to_add)
+        async def build_index(processed):
+            chunks, embeddings, chunk_metadata = processed
+            with metrics.time_stage("index_build"):
+                return VectorStoreService.from_embeddings([chunk.text for chunk in chunks], embeddings, chunk_metadata)
 
-            # 5. Perform semantic search for relevant clauses
-            query_embedding = gemini_service.generate_embeddings(combined_query, task_type="retrieval_query")
-            search_results = vector_store.search(query_embedding=query_embedding, top_k=5)
-            relevant_clauses = [match['text'] for match in search_results]
+        async def search(index, query_embedding):
+            with metrics.time_stage("search"):
+                hits = index.search(query_embedding=query_embedding, top_k=settings.RETRIEVAL_CANDIDATES)
+            return pack_context(
+                hits,
+                token_budget=settings.CONTEXT_TOKEN_BUDGET,
+                lower_is_better=True,
+                min_similarity=settings.CONTEXT_MIN_SIMILARITY,
+                duplicate_threshold=settings.CONTEXT_DUPLICATE_THRESHOLD,
+            )
 
-            # 6. Analyze relevant clauses with Gemini
+        async def analyze(entities, search_results):
             analyzed_clauses = await gemini_service.analyze_policy_clauses(
-                query=extracted_entities, 
-                document_chunks=relevant_clauses
+                query=entities,
+                document_chunks=[match['text'] for match in search_results]
             )
+            self._attach_sources(analyzed_clauses, search_results)
+            return analyzed_clauses
 
-            # 7. Generate the final decision with Gemini
-            final_decision = gemini_service.final_decision_reasoning(extracted_entities, analyzed_clauses)
+        async def decide(entities, analysis):
+            # Explicit structured fields from the request take precedence over extracted ones.
+            facts = {key: value for key, value in (entities or {}).items() if value is not None}
+            facts.update({key: value for key, value in (structured_query or {}).items() if value is not None})
+            decision = evaluate_decision(facts, analysis)
+            if decision["decision"] == "requires_review":
+                # The only LLM call left in the decision step: a narrative for the human reviewer.
+                decision["recommendations"].extend(await self._review_recommendations(facts, analysis, decision))
+            return decision
 
-            # 8. Combine all results for the final response
-            final_decision['entities'] = extracted_entities
-            final_decision['analysis'] = analyzed_clauses
+        # 2. Stages run as a dependency graph: entity extraction, the query embedding and all
+        #    document processing start together; each later stage starts once its inputs exist.
+        graph = TaskGraph()
+        graph.add("entities", lambda: self._extract_entities(combined_query, structured_query))
+        graph.add("query_embedding", lambda: gemini_service.generate_embeddings(combined_query, task_type="retrieval_query"))
+        graph.add("processed", process_documents)
+        graph.add("index", build_index, depends_on=["processed"])
+        graph.add("search_results", search, depends_on=["index", "query_embedding"])
+        graph.add("analysis", analyze, depends_on=["entities", "search_results"])
+        graph.add("decision", decide, depends_on=["entities", "analysis"])
 
-            return final_decision
+        try:
+            results = await graph.run()
+        except _NoDocumentContent:
+            return {
+                "error": "No content could be extracted from the provided documents.",
+                "documents_processed": document_status["processed"],
+                "documents_failed": document_status["failed"],
+            }
         except Exception as e:
             print(f"An unexpected error occurred in the evaluation pipeline: {e}")
             traceback.print_exc()
             raise
+
+        # 3. Combine all results for the final response
+        final_decision = results["decision"]
+        final_decision['entities'] = results["entities"]
+        final_decision['analysis'] = results["analysis"]
+        final_decision['documents_processed'] = document_status["processed"]
+        final_decision['documents_failed'] = document_status["failed"]
+        # Share of this request's chunks whose embeddings came from the embedding store.
+        lookups = embedding_cache_stats["lookups"]
+        final_decision['cache_hit_ratio'] = embedding_cache_stats["hits"] / lookups if lookups else 0.0
+        return final_decision
+
+    async def _extract_entities(self, query_text: str, structured_query: dict) -> dict:
+        """Parses the query locally and only falls back to the LLM when the parse is not confident."""
+        if not settings.ENTITY_PARSER_ENABLED:
+            return await self.gemini_service.extract_entities(query_text)
+        with metrics.time_stage("entity_parse"):
+            entities, confidence = parse_query(query_text, known=structured_query)
+        if is_confident(entities, confidence, settings.ENTITY_PARSER_MIN_CONFIDENCE):
+            return entities
+        extracted = await self.gemini_service.extract_entities(query_text)
+        if not isinstance(extracted, dict):
+            return entities
+        # Keep whatever the parser did find where the LLM came back empty.
+        return {**entities, **{key: value for key, value in extracted.items() if value is not None}}
+
+    async def _review_recommendations(self, facts: dict, analysis: list, decision: dict) -> list[dict]:
+        try:
+            narrative = await self.gemini_service.review_narrative(facts, analysis, decision)
+        except Exception as e:
+            print(f"Could not generate the review narrative: {e}")
+            return []
+        recommendations = []
+        if narrative.get("reasoning"):
+            recommendations.append({"type": "manual_review", "priority": "high", "message": str(narrative["reasoning"])})
+        for message in narrative.get("recommendations") or []:
+            recommendations.append({"type": "information_request", "priority": "medium", "message": str(message)})
+        return recommendations
+
+    async def _process_document(self, document: dict, embedding_cache_stats: Optional[dict] = None):
+        """
+        Fetches, extracts, chunks and embeds one document; returns (chunks, embeddings).
+        Chunks already in the embedding store (e.g. unchanged text from an earlier policy
+        version) are not embedded again; store lookups and hits are added to `embedding_cache_stats`.
+        """
+        chunks = await self.document_processor.process_document_async(document)
+        if not chunks:
+            return [], []
+        texts = [chunk.text for chunk in chunks]
+        if self.embedding_store:
+            return chunks, list(await self.embedding_store.embed(
+                texts, self.gemini_service.generate_embeddings_batch, stats=embedding_cache_stats
+            ))
+        return chunks, await self.gemini_service.generate_embeddings_batch(texts)
+
+    @staticmethod
+    def _policy_fields(document: dict) -> dict:
+        metadata = document.get("metadata") or {}
+        return {field: metadata.get(field) for field in ("policy_type", "effective_date", "version")}
+
+    @staticmethod
+    def _attach_sources(analyzed_clauses, search_results: list[dict]):
+        """Maps each analyzed clause's `source_index` back to the chunk's document, page, section and offsets."""
+        if not isinstance(analyzed_clauses, list):
+            return
+        for clause in analyzed_clauses:
+            if not isinstance(clause, dict):
+                continue
+            source_index = clause.get("source_index")
+            if not isinstance(source_index, int) or not 0 <= source_index < len(search_results):
+                continue
+            metadata = search_results[source_index].get("metadata")
+            if metadata:
+                clause["source"] = {
+                    "document": metadata.get("document") or "source_doc",
+                    "page": metadata.get("page", 1),
+                    "section": metadata.get("section") or "Details",
+                    "start_offset": metadata.get("start_offset"),
+                    "end_offset": metadata.get("end_offset"),
+                }
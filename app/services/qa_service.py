@@ -1,47 +1,290 @@
 import asyncio
+from functools import partial
+from typing import AsyncIterator, Awaitable, Callable, Optional
+import numpy as np
+from app.core.config import settings
+from app.services.answer_cache import answer_cache
+from app.services.context_packer import pack_context
 from app.services.document_processor import DocumentProcessor
-from app.services.gemini_service import GeminiPolicyProcessor
+from app.services.embedding_store import create_embedding_store
+from app.services.gemini_service import ANSWER_ERROR_PREFIX, GeminiPolicyProcessor
+from app.services.index_factory import create_index_store
+from app.services.ingestion_cache import IngestionCache
 from app.services.vector_store_service import VectorStoreService
 from app.api.schemas.evaluation import HackRxRequest
+from app.utils.metrics import metrics
+from app.utils.single_flight import SingleFlight
 
 class QAService:
-    def __init__(self):
+    def __init__(self, gemini_service: GeminiPolicyProcessor = None):
         self.document_processor = DocumentProcessor()
-        self.gemini_service = GeminiPolicyProcessor()
+        self.gemini_service = gemini_service or GeminiPolicyProcessor()
+        # Cached vectors are only valid for the same embedding model and chunking parameters.
+        namespace = (
+            f"{self.gemini_service.embedding_model}:"
+            f"{DocumentProcessor.CHUNK_SIZE}:{DocumentProcessor.CHUNK_OVERLAP}:{DocumentProcessor.CHUNKER_VERSION}"
+        )
+        self.index_store = create_index_store(namespace)
+        self.ingestion_cache = None
+        if settings.INGESTION_CACHE_ENABLED:
+            self.ingestion_cache = IngestionCache(
+                settings.INGESTION_CACHE_DIR,
+                settings.INGESTION_CACHE_MAX_BYTES,
+                namespace=namespace,
+            )
+        # Chunk embeddings only depend on the model, not on chunking parameters.
+        self.embedding_store = create_embedding_store(self.gemini_service.embedding_model)
+        self.answer_cache = answer_cache if settings.ANSWER_CACHE_ENABLED else None
+        self._ingestion_flights = SingleFlight()
+
+    def close(self):
+        """Persists state kept in memory between writes (ingestion cache access times)."""
+        if self.ingestion_cache:
+            self.ingestion_cache.flush()
 
     async def answer_questions(self, request: HackRxRequest) -> list[str]:
         """Orchestrates the Q&A process for a document and a list of questions."""
-        # 1. Process the document: download, extract text, and chunk it.
-        # The document processor expects a dict format similar to our old schema.
-        document_dict = {
-            'content': request.documents, 
-            'metadata': {'filename': request.documents.split('/')[-1].split('?')[0]}
-        }
-        text_chunks = self.document_processor.process_document(document_dict)
-
-        if not text_chunks:
+        answers = [None] * len(request.questions)
+        async for i, answer in self.iter_answers(await self.start_answering(request)):
+            answers[i] = answer
+        return answers
+
+    async def start_answering(self, request: HackRxRequest, batch_size: Optional[int] = None) -> list[Callable[[], Awaitable[list[tuple[int, str]]]]]:
+        """
+        Ingests the document and retrieves context for every question, then returns one callable
+        per answer batch of up to `batch_size` questions (default ANSWER_BATCH_SIZE). Calling it
+        starts the batch's LLM call and returns an awaitable of (question index, answer) pairs;
+        nothing is generated until `iter_answers` calls them.
+        """
+        # Retrieve generously; the packing stage decides how much context each question gets.
+        top_k = settings.RETRIEVAL_CANDIDATES
+        if settings.RETRIEVAL_MODE == "vector":
+            # 1. Process the document (or load it from the ingestion cache) into a vector store,
+            #    while embedding every question in a single call.
+            (content_hash, vector_store), question_embeddings = await asyncio.gather(
+                self._get_vector_store(request.documents),
+                self.gemini_service.generate_embeddings_batch(request.questions, task_type="retrieval_query"),
+            )
+
+            # 2. Retrieve chunks for all questions with one index search.
+            with metrics.time_stage("search"):
+                batch_results = vector_store.search_batch(question_embeddings, top_k=top_k)
+        else:
+            # 1-2. Lexical confidence decides which questions need an embedding, so questions are
+            #      only embedded after BM25 scoring, and only those that miss the fast path.
+            content_hash, vector_store = await self._get_vector_store(request.documents)
+            batch_results, question_embeddings = await self._retrieve_hybrid(request.questions, vector_store, top_k)
+
+        # 3. Answer from the semantic answer cache where possible; cached answers are ready at once.
+        ready = []
+        pending = []
+        for i, question in enumerate(request.questions):
+            cached = None
+            if self.answer_cache:
+                cached = self.answer_cache.lookup(content_hash, question, question_embeddings[i])
+            if cached is not None:
+                ready.append((i, cached))
+            else:
+                pending.append(i)
+
+        # 4. Pack the remaining questions, up to `batch_size` per LLM call.
+        batch_size = max(1, batch_size or settings.ANSWER_BATCH_SIZE)
+        answer_batches = [partial(self._ready, ready)] if ready else []
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            answer_batches.append(partial(
+                self._answer_batch,
+                content_hash,
+                batch,
+                [request.questions[i] for i in batch],
+                [self._pack_context(batch_results[i]) for i in batch],
+                [question_embeddings[i] for i in batch],
+            ))
+        return answer_batches
+
+    @staticmethod
+    async def iter_answers(answer_batches: list[Callable[[], Awaitable[list[tuple[int, str]]]]]) -> AsyncIterator[tuple[int, str]]:
+        """
+        Starts every answer batch and yields (question index, answer) pairs in completion order,
+        not question order. Batches are only started here, so an unconsumed stream costs nothing.
+        """
+        tasks = [asyncio.ensure_future(start_batch()) for start_batch in answer_batches]
+        try:
+            for next_batch in asyncio.as_completed(tasks):
+                for i, answer in await next_batch:
+                    yield i, answer
+        finally:
+            # If the consumer stops early (e.g. a streaming client disconnects), stop paying for LLM calls.
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def _pack_context(search_results: list[dict]) -> list[str]:
+        """Merges overlapping hits, drops near-duplicates and trims the context to the token budget."""
+        packed = pack_context(
+            search_results,
+            token_budget=settings.CONTEXT_TOKEN_BUDGET,
+            # Pure vector results are L2 distances; lexical and fused results are higher-is-better.
+            lower_is_better=settings.RETRIEVAL_MODE == "vector",
+            min_similarity=settings.CONTEXT_MIN_SIMILARITY,
+            duplicate_threshold=settings.CONTEXT_DUPLICATE_THRESHOLD,
+        )
+        return [result['text'] for result in packed]
+
+    @staticmethod
+    async def _ready(pairs: list[tuple[int, str]]) -> list[tuple[int, str]]:
+        return pairs
+
+    async def _answer_batch(self, content_hash: str, indices: list[int], questions: list[str], contexts: list[list[str]], embeddings: list) -> list[tuple[int, str]]:
+        answers = await self.gemini_service.generate_answers_batch(questions, contexts)
+        if self.answer_cache:
+            for question, answer, embedding in zip(questions, answers, embeddings):
+                if not answer.startswith(ANSWER_ERROR_PREFIX):
+                    self.answer_cache.store(content_hash, question, answer, embedding)
+        return list(zip(indices, answers))
+
+    async def _retrieve_hybrid(self, questions: list[str], vector_store: VectorStoreService, top_k: int) -> tuple[list[list[dict]], list]:
+        """
+        Runs BM25 for every question first. Questions whose lexical confidence clears
+        LEXICAL_FAST_PATH_CONFIDENCE (or all of them in "lexical" mode) use the BM25 hits
+        directly; the rest are embedded in one batch and fused by rank with their vector hits.
+        Returns the results and each question's embedding (None where none was computed).
+        """
+        with metrics.time_stage("search"):
+            lexical = [vector_store.search_lexical(question, top_k) for question in questions]
+        batch_results = [results for results, _ in lexical]
+        question_embeddings = [None] * len(questions)
+        if settings.RETRIEVAL_MODE == "lexical":
+            return batch_results, question_embeddings
+
+        pending = [
+            i for i, (results, confidence) in enumerate(lexical)
+            if not results or confidence < settings.LEXICAL_FAST_PATH_CONFIDENCE
+        ]
+        if not pending:
+            return batch_results, question_embeddings
+
+        # Observed only when an embedding call is made, so its count against the number of requests
+        # shows how often the lexical fast path skips the call.
+        with metrics.time_stage("query_embedding"):
+            pending_embeddings = await self.gemini_service.generate_embeddings_batch(
+                [questions[i] for i in pending], task_type="retrieval_query"
+            )
+        with metrics.time_stage("search"):
+            vector_results = vector_store.search_batch(pending_embeddings, top_k=top_k)
+        for i, embedding, vector_hits in zip(pending, pending_embeddings, vector_results):
+            question_embeddings[i] = embedding
+            batch_results[i] = VectorStoreService.fuse_results(
+                [vector_hits, batch_results[i]], top_k, rrf_k=settings.RRF_K
+            )
+        return batch_results, question_embeddings
+
+    async def _get_vector_store(self, document_url: str) -> tuple[str, VectorStoreService]:
+        """
+        Single-flight wrapper around `_build_vector_store`: concurrent requests for the same
+        document share one download/parse/embed and the resulting (read-only) vector store.
+        """
+        return await self._ingestion_flights.do(document_url, lambda: self._build_vector_store(document_url))
+
+    async def _build_vector_store(self, document_url: str) -> tuple[str, VectorStoreService]:
+        """
+        Downloads, extracts, chunks and embeds a document, reusing persisted results when possible.
+        Returns the document's content hash together with its vector store.
+        """
+        filename = document_url.split('/')[-1].split('?')[0]
+        is_url = document_url.startswith(('http://', 'https://'))
+
+        # a. Fast pre-check: an unchanged URL (same ETag/Last-Modified) skips the download.
+        if self.ingestion_cache and is_url:
+            with metrics.time_stage("download"):
+                validators = await self.document_processor.fetch_validators(document_url)
+            content_hash = self.ingestion_cache.lookup_url(
+                document_url, validators.get('etag'), validators.get('last_modified')
+            )
+            vector_store = self._load_vector_store(content_hash) if content_hash else None
+            if vector_store:
+                return content_hash, vector_store
+
+        # b. Download (streamed, hashed on the fly), then look the document up by content hash.
+        with metrics.time_stage("download"):
+            fetched = await self.document_processor.fetch_document(document_url)
+        with fetched:
+            content_hash = fetched.content_hash
+            vector_store = self._load_vector_store(content_hash)
+            if vector_store:
+                if self.ingestion_cache and is_url:
+                    # Remember the URL so the next request can use the pre-check.
+                    self.ingestion_cache.remember_url(document_url, content_hash, **fetched.validators)
+                return content_hash, vector_store
+
+            # c. Miss: extract, chunk and embed (only chunks the embedding store hasn't seen).
+            chunks = await self.document_processor.process_stream(fetched.stream, filename)
+            validators = fetched.validators
+
+        if not chunks:
             raise ValueError("Could not extract any text from the document.")
+        text_chunks = [chunk.text for chunk in chunks]
+        chunk_metadata = [{**chunk.to_metadata(), "document_id": content_hash} for chunk in chunks]
 
-        # 2. Create a vector store for the document chunks.
-        vector_store = VectorStoreService(dimension=768) # Gemini embedding dimension
-        embeddings = await self.gemini_service.generate_embeddings_batch(text_chunks)
-        vector_store.add_documents([{'text': chunk, 'embedding': emb} for chunk, emb in zip(text_chunks, embeddings)])
-
-        # 3. For each question, find relevant chunks and generate an answer.
-        answer_coroutines = []
-        for question in request.questions:
-            answer_coroutines.append(self._answer_single_question(question, vector_store))
-        
-        answers = await asyncio.gather(*answer_coroutines)
-        return answers
+        if self.embedding_store:
+            embedding_matrix = await self.embedding_store.embed(text_chunks, self.gemini_service.generate_embeddings_batch)
+        else:
+            embeddings = await self.gemini_service.generate_embeddings_batch(text_chunks)
+            embedding_matrix = np.asarray(embeddings, dtype=np.float32)
+
+        # A new version of a document already seen at this URL patches the old index instead,
+        # as long as the result is still small enough for the flat index type.
+        previous_store = None
+        if is_url and len(text_chunks) <= settings.VECTOR_INDEX_FLAT_MAX:
+            previous_store = self._previous_version(document_url, content_hash)
+
+        if self.ingestion_cache:
+            self.ingestion_cache.put(
+                content_hash, text_chunks, embedding_matrix, chunk_metadata,
+                url=document_url if is_url else None, **validators
+            )
+        with metrics.time_stage("index_build"):
+            if previous_store and previous_store.patch(text_chunks, embedding_matrix, chunk_metadata):
+                vector_store = previous_store
+            else:
+                vector_store = VectorStoreService.from_embeddings(text_chunks, embedding_matrix, chunk_metadata)
+        self._persist_vector_store(content_hash, vector_store)
+        return content_hash, vector_store
+
+    def _previous_version(self, document_url: str, content_hash: str):
+        """
+        Returns a modifiable (not memory-mapped) copy of the store for the content this URL
+        served last time, if that differs from `content_hash`; None otherwise.
+        """
+        if not self.ingestion_cache:
+            return None
+        previous_hash = self.ingestion_cache.content_hash_for_url(document_url)
+        if not previous_hash or previous_hash == content_hash:
+            return None
+        return self._load_vector_store(previous_hash, mmap=False)
+
+    def _load_vector_store(self, content_hash: str, mmap: Optional[bool] = None):
+        """
+        Returns a ready-to-search store for a document: the persisted (memory-mapped) index if
+        there is one, otherwise an index rebuilt from cached embeddings. None if neither exists.
+        """
+        if self.index_store:
+            vector_store = self.index_store.load(content_hash, mmap=mmap)
+            if vector_store:
+                return vector_store
 
-    async def _answer_single_question(self, question: str, vector_store: VectorStoreService) -> str:
-        """Generates an answer for a single question using semantic search and an LLM."""
-        # a. Find relevant chunks from the document.
-        question_embedding = await self.gemini_service.generate_embeddings(question, task_type="retrieval_query")
-        search_results = vector_store.search(question_embedding, top_k=5)
-        relevant_chunks = [result['text'] for result in search_results]
+        cached = self.ingestion_cache.get(content_hash) if self.ingestion_cache else None
+        if not cached:
+            return None
+        with metrics.time_stage("index_build"):
+            vector_store = VectorStoreService.from_embeddings(*cached)
+        self._persist_vector_store(content_hash, vector_store)
+        return vector_store
 
-        # b. Ask the LLM to generate a concise answer based on the chunks.
-        answer = await self.gemini_service.generate_answer_from_context(question, relevant_chunks)
-        return answer
+    def _persist_vector_store(self, content_hash: str, vector_store: VectorStoreService):
+        if not self.index_store:
+            return
+        if settings.RETRIEVAL_MODE != "vector":
+            # Build the BM25 index now so it is persisted alongside the FAISS index.
+            vector_store.build_lexical_index()
+        self.index_store.save(content_hash, vector_store)
@@ -0,0 +1,145 @@
+import re
+from typing import Optional
+
+# Fields the decision rules cannot do without; if either is missing or ambiguous, use the LLM.
+REQUIRED_FIELDS = ("procedure", "policy_duration_months")
+
+# Share of the confidence score each field contributes when found unambiguously.
+FIELD_WEIGHTS = {"age": 0.15, "gender": 0.05, "procedure": 0.35, "policy_duration_months": 0.3, "location": 0.15}
+
+# Procedures as they appear in shorthand queries, mapped to one canonical name.
+PROCEDURES = {
+    "knee surgery": ("knee surgery", "knee operation", "knee replacement", "knee arthroplasty", "acl reconstruction", "acl surgery"),
+    "hip replacement": ("hip replacement", "hip surgery", "hip arthroplasty"),
+    "cataract surgery": ("cataract surgery", "cataract operation", "cataract"),
+    "heart bypass surgery": ("bypass surgery", "heart bypass", "cabg", "coronary bypass"),
+    "angioplasty": ("angioplasty", "stent placement", "ptca"),
+    "appendectomy": ("appendectomy", "appendicectomy", "appendix surgery", "appendix removal"),
+    "gallbladder removal": ("gallbladder removal", "gallbladder surgery", "cholecystectomy"),
+    "hernia repair": ("hernia repair", "hernia surgery", "hernioplasty", "herniorrhaphy"),
+    "kidney stone removal": ("kidney stone removal", "kidney stone", "lithotripsy"),
+    "dialysis": ("dialysis", "haemodialysis", "hemodialysis"),
+    "chemotherapy": ("chemotherapy", "chemo"),
+    "radiotherapy": ("radiotherapy", "radiation therapy"),
+    "maternity": ("maternity", "childbirth", "normal delivery", "delivery", "pregnancy"),
+    "caesarean section": ("c-section", "c section", "caesarean", "cesarean"),
+    "hysterectomy": ("hysterectomy",),
+    "tonsillectomy": ("tonsillectomy", "tonsil removal"),
+    "spinal surgery": ("spinal surgery", "spine surgery", "back surgery", "disc surgery", "laminectomy"),
+    "bariatric surgery": ("bariatric surgery", "weight loss surgery", "gastric bypass"),
+    "dental treatment": ("dental treatment", "dental surgery", "root canal", "tooth extraction"),
+    "ivf": ("ivf", "in vitro fertilisation", "in vitro fertilization", "infertility treatment"),
+    "organ transplant": ("organ transplant", "kidney transplant", "liver transplant"),
+    "cosmetic surgery": ("cosmetic surgery", "plastic surgery", "rhinoplasty", "liposuction"),
+}
+
+# Cities, with common alternate spellings mapped to one canonical name.
+CITIES = {
+    "Mumbai": ("mumbai", "bombay"), "Delhi": ("new delhi", "delhi"), "Bengaluru": ("bengaluru", "bangalore"),
+    "Hyderabad": ("hyderabad",), "Ahmedabad": ("ahmedabad",), "Chennai": ("chennai", "madras"),
+    "Kolkata": ("kolkata", "calcutta"), "Pune": ("pune", "poona"), "Jaipur": ("jaipur",), "Lucknow": ("lucknow",),
+    "Kanpur": ("kanpur",), "Nagpur": ("nagpur",), "Indore": ("indore",), "Thane": ("thane",), "Bhopal": ("bhopal",),
+    "Visakhapatnam": ("visakhapatnam", "vizag"), "Patna": ("patna",), "Vadodara": ("vadodara", "baroda"),
+    "Ghaziabad": ("ghaziabad",), "Ludhiana": ("ludhiana",), "Agra": ("agra",), "Nashik": ("nashik", "nasik"),
+    "Faridabad": ("faridabad",), "Meerut": ("meerut",), "Rajkot": ("rajkot",), "Varanasi": ("varanasi", "benaras"),
+    "Srinagar": ("srinagar",), "Aurangabad": ("aurangabad",), "Amritsar": ("amritsar",), "Noida": ("noida",),
+    "Gurugram": ("gurugram", "gurgaon"), "Chandigarh": ("chandigarh",), "Coimbatore": ("coimbatore",),
+    "Kochi": ("kochi", "cochin"), "Mysuru": ("mysuru", "mysore"), "Surat": ("surat",), "Guwahati": ("guwahati",),
+    "Bhubaneswar": ("bhubaneswar",), "Dehradun": ("dehradun",), "Thiruvananthapuram": ("thiruvananthapuram", "trivandrum"),
+}
+
+
+def _alias_pattern(gazetteer: dict) -> tuple[re.Pattern, dict]:
+    """One alternation over every alias, longest first so "knee replacement" beats "knee"."""
+    canonical = {alias: name for name, aliases in gazetteer.items() for alias in aliases}
+    alternation = "|".join(re.escape(alias) for alias in sorted(canonical, key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternation})\b", re.IGNORECASE), canonical
+
+
+PROCEDURE_PATTERN, PROCEDURE_ALIASES = _alias_pattern(PROCEDURES)
+CITY_PATTERN, CITY_ALIASES = _alias_pattern(CITIES)
+
+_GENDER = r"(m|f|male|female|man|woman|boy|girl)"
+# "46M", "46 M", "46-year-old male", "46 yo female", "46 yrs, F"
+AGE_GENDER_PATTERN = re.compile(
+    rf"\b(\d{{1,3}})\s*(?:-?\s*(?:years?|yrs?|yo|y)(?:\s*-?\s*old)?)?\s*[,/-]?\s*{_GENDER}\b", re.IGNORECASE
+)
+# "M46", "male, 46", "female aged 46"
+GENDER_AGE_PATTERN = re.compile(rf"\b{_GENDER}\s*[,/-]?\s*(?:aged?\s*)?(\d{{1,3}})\b(?!\s*-?\s*(?:months?|mos?|years?|yrs?))", re.IGNORECASE)
+AGE_PATTERN = re.compile(r"\b(?:aged?\s*(?:is\s*)?(\d{1,3})|(\d{1,3})\s*-?\s*(?:years?|yrs?|yo)(?:\s*-?\s*old)?)\b(?!\s*-?\s*(?:old\s+)?(?:policy|cover|plan|insurance))", re.IGNORECASE)
+GENDER_PATTERN = re.compile(r"\b(?:gender\s*(?:is\s*)?)?(male|female|man|woman)\b", re.IGNORECASE)
+
+_DURATION = r"(\d+(?:\.\d+)?)\s*-?\s*(months?|mos?|mths?|m|years?|yrs?|y)\b"
+_POLICY = r"(?:policy|cover|coverage|plan|insurance)"
+# "3-month policy", "3 months old policy", "policy of 3 months", "policy duration months is 3"
+DURATION_PATTERNS = (
+    re.compile(rf"{_DURATION}\s*(?:old\s+)?{_POLICY}", re.IGNORECASE),
+    re.compile(rf"{_POLICY}\s*(?:duration|age|tenure|term)?\s*(?:of|for|since|is|:)?\s*{_DURATION}", re.IGNORECASE),
+)
+STRUCTURED_DURATION_PATTERN = re.compile(r"policy duration months is (\d+)", re.IGNORECASE)
+
+
+def _gender(token: str) -> str:
+    return "F" if token.lower() in ("f", "female", "woman", "girl") else "M"
+
+
+def _months(amount: str, unit: str) -> int:
+    value = float(amount)
+    return round(value * 12) if unit.lower().startswith("y") else round(value)
+
+
+def _unique(values: list):
+    """The single distinct value, or None when there is none or several conflicting ones."""
+    distinct = set(values)
+    return distinct.pop() if len(distinct) == 1 else None
+
+
+def parse_query(text: str, known: Optional[dict] = None) -> tuple[dict, float]:
+    """
+    Parses shorthand claim queries ("46M, knee surgery, Pune, 3-month policy") into the same
+    fields `extract_entities` returns, without an LLM call. `known` values (e.g. a request's
+    structured_data) take precedence and count as certain.
+
+    Returns (entities, confidence). Confidence is the weighted share of fields found exactly
+    once; a field matched with conflicting values is left as None and counts as missing.
+    """
+    known = {key: value for key, value in (known or {}).items() if value is not None}
+    found: dict[str, list] = {field: [] for field in FIELD_WEIGHTS}
+
+    for pattern in DURATION_PATTERNS:
+        found["policy_duration_months"].extend(_months(amount, unit) for amount, unit in pattern.findall(text))
+        # Blank durations out so "3m policy" or "policy 2 years old" is not also read as an age.
+        text = pattern.sub(" ", text)
+    found["policy_duration_months"].extend(int(months) for months in STRUCTURED_DURATION_PATTERN.findall(text))
+
+    for age, gender in AGE_GENDER_PATTERN.findall(text):
+        found["age"].append(int(age))
+        found["gender"].append(_gender(gender))
+    for gender, age in GENDER_AGE_PATTERN.findall(text):
+        found["age"].append(int(age))
+        found["gender"].append(_gender(gender))
+    if not found["age"]:
+        found["age"] = [int(a or b) for a, b in AGE_PATTERN.findall(text)]
+    if not found["gender"]:
+        found["gender"] = [_gender(gender) for gender in GENDER_PATTERN.findall(text)]
+
+    found["procedure"] = [PROCEDURE_ALIASES[match.lower()] for match in PROCEDURE_PATTERN.findall(text)]
+    found["location"] = [CITY_ALIASES[match.lower()] for match in CITY_PATTERN.findall(text)]
+
+    entities = {}
+    confidence = 0.0
+    for field, weight in FIELD_WEIGHTS.items():
+        if field in known:
+            entities[field] = known[field]
+            confidence += weight
+            continue
+        value = _unique(found[field])
+        entities[field] = value
+        if value is not None:
+            confidence += weight
+    return entities, round(confidence, 3)
+
+
+def is_confident(entities: dict, confidence: float, min_confidence: float) -> bool:
+    """True when the parse can replace the LLM: every required field is set and the score is high enough."""
+    return confidence >= min_confidence and all(entities.get(field) is not None for field in REQUIRED_FIELDS)
@@ -0,0 +1,276 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, Optional
+
+from ..core.config import settings
+from ..utils.lazy_import import lazy_import
+from ..utils.metrics import metrics
+from .ocr_cache import OcrCache
+
+pypdf = lazy_import("pypdf")
+docx = lazy_import("docx")
+pytesseract = lazy_import("pytesseract")
+
+
+# --- Worker functions. These run inside the process pool, so they must stay module-level. --- #
+
+def _extract_pdf_pages(path: str, worker_index: int, worker_count: int, ocr_min_text_chars: int = 0) -> list[tuple[int, str, Optional[str]]]:
+    """
+    Extracts every `worker_count`-th page starting at `worker_index`, as (page index, text,
+    image hash). The image hash is only computed for pages whose text layer is shorter than
+    `ocr_min_text_chars` and is None unless the page is an OCR candidate.
+
+    The reader is backed by the file at `path`, so a worker only reads and parses the objects
+    of its own pages rather than receiving (and holding) the whole document.
+    """
+    reader = pypdf.PdfReader(path)
+    pages = []
+    for page_index in range(worker_index, len(reader.pages), worker_count):
+        page = reader.pages[page_index]
+        text = page.extract_text() or ""
+        image_hash = _page_image_hash(page) if len(text.strip()) < ocr_min_text_chars else None
+        pages.append((page_index, text, image_hash))
+    return pages
+
+
+def _page_image_hash(page) -> Optional[str]:
+    """SHA-256 over a page's images, or None if the page has no images (a blank page)."""
+    digest = hashlib.sha256()
+    found = _hash_images(page.get("/Resources"), digest, set())
+    return digest.hexdigest() if found else None
+
+
+def _hash_images(resources, digest, seen: set) -> bool:
+    """
+    Feeds every image reachable from `resources` into `digest`, descending into Form XObjects,
+    which scanners often wrap page images in. Returns whether any image was found.
+    """
+    xobjects = resources.get_object().get("/XObject") if resources else None
+    if not xobjects:
+        return False
+    xobjects = xobjects.get_object()
+    found = False
+    for name in sorted(xobjects):
+        reference = xobjects[name]
+        # Forms may share or (in malformed files) cycle through objects; visit each once.
+        object_id = getattr(reference, "idnum", None)
+        if object_id is not None:
+            if object_id in seen:
+                continue
+            seen.add(object_id)
+        xobject = reference.get_object()
+        subtype = xobject.get("/Subtype")
+        if subtype == "/Image":
+            digest.update(xobject.get_data())
+            found = True
+        elif subtype == "/Form":
+            found = _hash_images(xobject.get("/Resources"), digest, seen) or found
+    return found
+
+
+def _ocr_pdf_pages(path: str, page_indices: list[int], language: str) -> list[tuple[int, str]]:
+    """
+    Runs tesseract over the images of each listed page. Scanned PDFs store each page as an
+    embedded image, so decoding those images is the rasterisation step (no PDF renderer needed).
+    """
+    reader = pypdf.PdfReader(path)
+    results = []
+    for page_index in page_indices:
+        texts = []
+        for image_file in reader.pages[page_index].images:
+            image = image_file.image
+            if image.mode not in ("1", "L", "RGB"):
+                image = image.convert("RGB")
+            text = pytesseract.image_to_string(image, lang=language).strip()
+            if text:
+                texts.append(text)
+        results.append((page_index, "\n\n".join(texts)))
+    return results
+
+
+def _extract_docx_text(path: str) -> str:
+    doc = docx.Document(path)
+    return "\n".join(para.text for para in doc.paragraphs)
+
+
+class ExtractionTimeoutError(TimeoutError):
+    """Raised when text extraction for a single document exceeds the configured timeout."""
+
+
+class TextExtractor:
+    """
+    Extracts document text on a bounded process pool so CPU-bound parsing neither holds
+    the GIL nor runs on the event loop thread. PDF pages are fanned out across workers
+    and joined once, in page order.
+
+    With OCR enabled, PDF pages without a usable text layer (scanned pages) are OCR'd on the
+    same pool, and the output is cached by page image hash so each scan is recognised once.
+    """
+    # Below this many bytes per worker, spreading a PDF across processes costs more than it saves.
+    MIN_BYTES_PER_WORKER = 256 * 1024
+    COPY_CHUNK_BYTES = 1024 * 1024
+
+    def __init__(self, max_workers: int, timeout: float, ocr_enabled: bool = False, ocr_language: str = "eng",
+                 ocr_min_text_chars: int = 20, ocr_timeout: float = 300.0, ocr_cache: Optional[OcrCache] = None):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.ocr_enabled = ocr_enabled
+        self.ocr_language = ocr_language
+        self.ocr_min_text_chars = ocr_min_text_chars
+        self.ocr_timeout = ocr_timeout
+        self.ocr_cache = ocr_cache
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # "spawn" avoids forking a process that already has an event loop and live threads.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        """Drops a broken pool so the next call starts a fresh one (unless another caller already did)."""
+        if self._executor is executor:
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run_in_pool(self, fn, *args):
+        """
+        Runs `fn(*args)` on the process pool. A worker that dies (OOM, a parser segfault) breaks the
+        whole pool, so the pool is replaced and the call retried once; a second failure is raised.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            print(f"Extraction worker pool broke; retrying {fn.__name__} on a fresh pool.")
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+
+    async def extract_pages(self, stream: BinaryIO, filename: str) -> list[str]:
+        """
+        Returns the document text as a list of pages. Formats without pages (DOCX, plain text)
+        come back as a single entry.
+        """
+        file_ext = filename.split('.')[-1].lower() if '.' in filename else ''
+        if file_ext not in ('pdf', 'docx'):
+            # Default to plain text for .txt and other unknown types
+            return [stream.read().decode('utf-8', errors='ignore')]
+
+        # Workers open the document by path, so the body is never copied into this process's
+        # memory or pickled to each worker; a spooled body is streamed to disk in chunks.
+        path, size = await asyncio.to_thread(self._spool_to_path, stream, file_ext)
+        try:
+            if file_ext == 'docx':
+                return [await self._with_timeout(self._run_in_pool(_extract_docx_text, path), self.timeout)]
+
+            pages = await self._with_timeout(self._extract_pdf(path, size), self.timeout)
+            texts = [text for _, text, _ in pages]
+            if self.ocr_enabled and any(image_hash for _, _, image_hash in pages):
+                try:
+                    with metrics.time_stage("ocr"):
+                        ocr_texts = await self._with_timeout(self._ocr_scanned_pages(path, pages), self.ocr_timeout)
+                except Exception as e:
+                    # E.g. no tesseract binary or an undecodable image: keep whatever text layer exists.
+                    print(f"OCR failed, continuing without it: {e!r}")
+                    ocr_texts = {}
+                for page_index, text in ocr_texts.items():
+                    if len(text) > len(texts[page_index].strip()):
+                        texts[page_index] = text
+            return texts
+        finally:
+            # Timed-out workers may still hold the file open; on POSIX unlinking it is still safe.
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _spool_to_path(stream: BinaryIO, file_ext: str) -> tuple[str, int]:
+        """Copies `stream` to a named temporary file and returns (path, size in bytes)."""
+        with tempfile.NamedTemporaryFile(suffix=f".{file_ext}", delete=False) as f:
+            shutil.copyfileobj(stream, f, TextExtractor.COPY_CHUNK_BYTES)
+            return f.name, f.tell()
+
+    async def extract(self, stream: BinaryIO, filename: str) -> str:
+        """Returns the full document text, joined once."""
+        return "".join(await self.extract_pages(stream, filename))
+
+    async def _extract_pdf(self, path: str, size: int) -> list[tuple[int, str, Optional[str]]]:
+        """Returns (page index, text, image hash of OCR candidates) for every page, in page order."""
+        worker_count = max(1, min(self.max_workers, size // self.MIN_BYTES_PER_WORKER))
+        ocr_min_text_chars = self.ocr_min_text_chars if self.ocr_enabled else 0
+
+        partials = await asyncio.gather(*[
+            self._run_in_pool(_extract_pdf_pages, path, worker_index, worker_count, ocr_min_text_chars)
+            for worker_index in range(worker_count)
+        ])
+
+        pages = [page for partial in partials for page in partial]
+        pages.sort(key=lambda page: page[0])
+        return pages
+
+    async def _ocr_scanned_pages(self, path: str, pages: list[tuple[int, str, Optional[str]]]) -> dict[int, str]:
+        """Returns OCR text by page index for image-only pages, from the cache where possible."""
+        scanned = {page_index: image_hash for page_index, _, image_hash in pages if image_hash}
+        # Cache files are read and written in a worker thread, off the event loop.
+        cached = await asyncio.to_thread(self.ocr_cache.get_many, list(scanned.values())) if self.ocr_cache else {}
+        ocr_texts = {}
+        misses = []
+        for page_index, image_hash in scanned.items():
+            if image_hash in cached:
+                ocr_texts[page_index] = cached[image_hash]
+            else:
+                misses.append(page_index)
+        if not misses:
+            return ocr_texts
+
+        # OCR is far slower per page than text extraction, so pages are spread over every worker.
+        worker_count = min(self.max_workers, len(misses))
+        partials = await asyncio.gather(*[
+            self._run_in_pool(_ocr_pdf_pages, path, misses[worker_index::worker_count], self.ocr_language)
+            for worker_index in range(worker_count)
+        ])
+        recognised = {page_index: text for partial in partials for page_index, text in partial}
+        ocr_texts.update(recognised)
+        if self.ocr_cache:
+            await asyncio.to_thread(
+                self.ocr_cache.put_many, {scanned[page_index]: text for page_index, text in recognised.items()}
+            )
+        return ocr_texts
+
+    async def _with_timeout(self, awaitable, timeout: float):
+        try:
+            return await asyncio.wait_for(awaitable, timeout=timeout)
+        except asyncio.TimeoutError:
+            # Pool workers cannot be interrupted mid-page; they finish in the background
+            # but their results are discarded.
+            raise ExtractionTimeoutError(
+                f"Text extraction exceeded the {timeout}s timeout."
+            ) from None
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Shared so every request draws from one bounded pool.
+text_extractor = TextExtractor(
+    max_workers=settings.EXTRACTION_MAX_WORKERS,
+    timeout=settings.EXTRACTION_TIMEOUT_SECONDS,
+    ocr_enabled=settings.OCR_ENABLED,
+    ocr_language=settings.OCR_LANGUAGE,
+    ocr_min_text_chars=settings.OCR_MIN_TEXT_CHARS,
+    ocr_timeout=settings.OCR_TIMEOUT_SECONDS,
+    ocr_cache=OcrCache(settings.OCR_CACHE_DIR, settings.OCR_CACHE_MAX_BYTES, namespace=f"tesseract:{settings.OCR_LANGUAGE}"),
+)
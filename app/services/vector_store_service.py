@@ -1,51 +1,230 @@
-import faiss
+import os
+import pickle
+from typing import Optional
 import numpy as np
+from .bm25_index import BM25Index
+from .chunk_store import ChunkStore
+from .index_factory import build_index, faiss, read_index, search_parameters
 
 class VectorStoreService:
-    def __init__(self, dimension: int):
+    INDEX_FILE = "index.faiss"
+    CHUNKS_PREFIX = "chunks"
+    LEXICAL_INDEX_FILE = "bm25.pkl"
+
+    def __init__(self, dimension: int, index: "faiss.Index" = None):
         """Initializes an in-memory FAISS index."""
         self.dimension = dimension
-        # Using a flat L2 index for exact search. It's simple and effective for this use case.
-        self.index = faiss.IndexFlatL2(dimension)
-        self.document_chunks = []
+        # Defaults to a flat L2 index for exact search; `from_embeddings` picks a type by corpus size.
+        self.index = index if index is not None else faiss.IndexFlatL2(dimension)
+        # Chunk texts plus per-chunk provenance (document, page, offsets, policy fields); row i of
+        # the index is chunk i.
+        self.chunks = ChunkStore()
+        # Built lazily on the first lexical search and rebuilt after chunks are added.
+        self._lexical_index = None
+
+    @classmethod
+    def from_embeddings(cls, texts: list[str], embeddings, metadata: list[dict] = None) -> "VectorStoreService":
+        """Builds a store whose index type (flat, HNSW or IVF) is chosen by the number of chunks."""
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        vector_store = cls(dimension=matrix.shape[1], index=build_index(matrix))
+        vector_store.chunks = ChunkStore(texts, metadata)
+        return vector_store
+
+    def save(self, directory: str):
+        """Persists the index and its chunk store to `directory`."""
+        faiss.write_index(self.index, os.path.join(directory, self.INDEX_FILE))
+        self.chunks.save(directory, self.CHUNKS_PREFIX)
+        if self._lexical_index is not None:
+            with open(os.path.join(directory, self.LEXICAL_INDEX_FILE), "wb") as f:
+                pickle.dump(self._lexical_index, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "VectorStoreService":
+        """Loads a store saved with `save`, memory-mapping the index (where supported) and the chunk store."""
+        index = read_index(os.path.join(directory, cls.INDEX_FILE), mmap=mmap)
+        chunks = ChunkStore.load(directory, cls.CHUNKS_PREFIX, mmap=mmap)
+        if len(chunks) != index.ntotal:
+            raise ValueError("Persisted chunks do not match the persisted index.")
+        vector_store = cls(dimension=index.d, index=index)
+        vector_store.chunks = chunks
+
+        lexical_path = os.path.join(directory, cls.LEXICAL_INDEX_FILE)
+        if os.path.exists(lexical_path):
+            with open(lexical_path, "rb") as f:
+                vector_store._lexical_index = pickle.load(f)
+        return vector_store
 
     def add_documents(self, documents: list[dict]):
         """
         Adds document embeddings to the FAISS index.
-        Each document should be a dictionary with 'text' and 'embedding' keys.
+        Each document should be a dictionary with 'text' and 'embedding' keys, and optionally
+        a 'metadata' dict describing where the chunk came from.
         """
         if not documents:
             return
 
         # Store the original text chunks in the same order
-        self.document_chunks.extend([doc['text'] for doc in documents])
+        self.chunks.extend([doc['text'] for doc in documents], [doc.get('metadata') for doc in documents])
+        self._lexical_index = None
+
+        # Copy embeddings straight into one preallocated contiguous float32 matrix,
+        # instead of building a float64 array and converting it a second time.
+        embeddings = np.empty((len(documents), self.dimension), dtype=np.float32)
+        for row, doc in enumerate(documents):
+            embeddings[row] = doc['embedding']
 
-        # Extract embeddings and convert them to a NumPy array of type float32
-        embeddings = np.array([doc['embedding'] for doc in documents]).astype('float32')
-        
         # Add the embeddings to the FAISS index
         self.index.add(embeddings)
 
-    def search(self, query_embedding: list, top_k: int) -> list[dict]:
+    def add_embeddings(self, texts: list[str], embeddings: np.ndarray, metadata: list[dict] = None):
+        """
+        Adds chunks with a precomputed (n, dimension) embedding matrix, e.g. one loaded
+        from the ingestion cache, without round-tripping through Python lists.
+        """
+        if not texts:
+            return
+
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        self.chunks.extend(texts, metadata)
+        self._lexical_index = None
+        self.index.add(matrix)
+
+    def patch(self, texts: list[str], embeddings, metadata: list[dict] = None) -> bool:
+        """
+        Updates the store in place to hold `texts` (with `embeddings` and `metadata` aligned to
+        them), e.g. to move from one version of a document to the next: vectors of chunks that
+        are gone are removed, new chunks are appended, and unchanged chunks keep their vectors.
+        Only indexes that store codes contiguously (flat, SQ, PQ) support removal in place;
+        returns False for other index types so the caller rebuilds instead.
+        """
+        if not isinstance(self.index, faiss.IndexFlatCodes):
+            return False
+
+        new_positions: dict[str, list[int]] = {}
+        for position, text in enumerate(texts):
+            new_positions.setdefault(text, []).append(position)
+
+        removed, order = [], []
+        for chunk_id, text in enumerate(self.chunks.texts()):
+            positions = new_positions.get(text)
+            if positions:
+                order.append(positions.pop(0))
+            else:
+                removed.append(chunk_id)
+        added = sorted(position for positions in new_positions.values() for position in positions)
+
+        if removed:
+            # Flat-code indexes compact on removal, keeping surviving rows in their original order.
+            self.index.remove_ids(np.asarray(removed, dtype=np.int64))
+        if added:
+            matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+            self.index.add(np.ascontiguousarray(matrix[added]))
+        order.extend(added)
+
+        # Row i of the index now holds texts[order[i]].
+        self.chunks = ChunkStore(
+            [texts[position] for position in order], [metadata[position] for position in order] if metadata else None
+        )
+        self._lexical_index = None
+        return True
+
+    def search(self, query_embedding: list, top_k: int, filters: Optional[dict] = None) -> list[dict]:
         """
-        Searches the index for the most similar document chunks.
+        Searches the index for the most similar document chunks, optionally only among chunks
+        whose metadata matches `filters` (see `ChunkStore.mask`).
         Returns a list of dictionaries, each containing the text and similarity score.
         """
-        if self.index.ntotal == 0:
+        params = self._search_parameters(filters)
+        if self.index.ntotal == 0 or params is False:
             return []
 
         # Convert the query embedding to a NumPy array
         query_vector = np.array([query_embedding]).astype('float32')
 
         # Perform the search
-        distances, indices = self.index.search(query_vector, top_k)
+        distances, indices = self.index.search(query_vector, top_k, params=params)
 
         # Process and return the results
         results = []
         for i, dist in zip(indices[0], distances[0]):
             if i != -1:  # FAISS returns -1 if no neighbors are found
-                results.append({
-                    'text': self.document_chunks[i],
-                    'score': float(dist) # Lower distance means more similar
-                })
+                results.append(self._result(i, float(dist))) # Lower distance means more similar
         return results
+
+    def search_batch(self, query_embeddings, top_k: int, filters: Optional[dict] = None) -> list[list[dict]]:
+        """
+        Searches the index for several queries with a single FAISS call.
+        Takes an (n_queries, dimension) matrix and returns one result list per query row.
+        """
+        query_matrix = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+        if query_matrix.ndim == 1:
+            query_matrix = query_matrix.reshape(1, -1)
+
+        params = self._search_parameters(filters)
+        if self.index.ntotal == 0 or params is False:
+            return [[] for _ in range(query_matrix.shape[0])]
+
+        distances, indices = self.index.search(query_matrix, top_k, params=params)
+
+        batch_results = []
+        for row_indices, row_distances in zip(indices, distances):
+            batch_results.append([
+                self._result(i, float(dist))
+                for i, dist in zip(row_indices, row_distances)
+                if i != -1
+            ])
+        return batch_results
+
+    def _search_parameters(self, filters: Optional[dict]):
+        """
+        FAISS search parameters limiting the search to chunks matching `filters`: None without
+        filters, False when no chunk matches (there is nothing to search).
+        """
+        if not filters:
+            return None
+        ids = np.flatnonzero(self.chunks.mask(filters))
+        if len(ids) == 0:
+            return False
+        return search_parameters(self.index, ids)
+
+    def _result(self, chunk_id: int, score: float) -> dict:
+        """Builds a search result: chunk id, text, score and, when known, the chunk's provenance."""
+        result = {'chunk_id': int(chunk_id), 'text': self.chunks[chunk_id], 'score': score}
+        metadata = self.chunks.metadata(chunk_id)
+        if metadata:
+            result['metadata'] = metadata
+        return result
+
+    @property
+    def lexical_index(self) -> BM25Index:
+        return self.build_lexical_index()
+
+    def build_lexical_index(self) -> BM25Index:
+        """Builds the BM25 index unless it is already built (or was loaded), and returns it."""
+        if self._lexical_index is None:
+            self._lexical_index = BM25Index(self.chunks.texts())
+        return self._lexical_index
+
+    def search_lexical(self, query_text: str, top_k: int, filters: Optional[dict] = None) -> tuple[list[dict], float]:
+        """
+        BM25 keyword search over the stored chunks (those matching `filters`, if given). Needs no
+        query embedding. Returns the results (higher score is better) and the lexical confidence in [0, 1].
+        """
+        allowed = self.chunks.mask(filters) if filters else None
+        hits, confidence = self.lexical_index.search(query_text, top_k, allowed=allowed)
+        results = [self._result(chunk_id, score) for chunk_id, score in hits]
+        return results, confidence
+
+    @staticmethod
+    def fuse_results(result_lists: list[list[dict]], top_k: int, rrf_k: int = 60) -> list[dict]:
+        """
+        Reciprocal rank fusion: each list contributes 1 / (rrf_k + rank) per chunk. Only ranks are
+        used, so L2 distances and BM25 scores can be combined without calibration.
+        The fused score is higher-is-better.
+        """
+        fused = {}
+        for results in result_lists:
+            for rank, result in enumerate(results):
+                entry = fused.setdefault(result['chunk_id'], {**result, 'score': 0.0})
+                entry['score'] += 1.0 / (rrf_k + rank + 1)
+        return sorted(fused.values(), key=lambda result: result['score'], reverse=True)[:top_k]
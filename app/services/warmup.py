@@ -0,0 +1,35 @@
+import asyncio
+
+import numpy as np
+
+from ..core.config import settings
+from ..utils.metrics import metrics
+from .gemini_service import GeminiPolicyProcessor
+from .vector_store_service import VectorStoreService
+
+
+async def warm_up(gemini_service: GeminiPolicyProcessor):
+    """
+    Pays one-time startup costs before the first request: loading the Gemini SDK and opening its
+    connection with a single query embedding, and loading FAISS with a tiny index build/search.
+    Failures and timeouts are logged and ignored; warm-up must never block serving.
+    """
+    with metrics.time_stage("warmup"):
+        results = await asyncio.gather(
+            asyncio.wait_for(_warm_model(gemini_service), settings.WARMUP_TIMEOUT_SECONDS),
+            asyncio.wait_for(asyncio.to_thread(_warm_index), settings.WARMUP_TIMEOUT_SECONDS),
+            return_exceptions=True,
+        )
+    for step, result in zip(("model client", "vector index"), results):
+        if isinstance(result, BaseException):
+            print(f"Warm-up of the {step} failed: {result!r}")
+
+
+async def _warm_model(gemini_service: GeminiPolicyProcessor):
+    await gemini_service.generate_embeddings("warm-up", task_type="retrieval_query")
+
+
+def _warm_index():
+    matrix = np.random.default_rng(0).standard_normal((16, 8)).astype(np.float32)
+    vector_store = VectorStoreService.from_embeddings([""] * len(matrix), matrix)
+    vector_store.search(query_embedding=matrix[0], top_k=1)
@@ -26,3 +26,27 @@ class DocumentProcessingError(APIException):
             code="DOCUMENT_PROCESSING_FAILED",
             message=message
         )
+
+class EvaluationQueueFullError(APIException):
+    def __init__(self, message: str = "Too many evaluations are queued; retry later"):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            code="EVALUATION_QUEUE_FULL",
+            message=message
+        )
+
+class TaskNotFoundError(APIException):
+    def __init__(self, task_id: str):
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            code="TASK_NOT_FOUND",
+            message=f"No evaluation task with id {task_id}"
+        )
+
+class TaskNotReadyError(APIException):
+    def __init__(self, task_id: str, task_status: str):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            code="TASK_NOT_READY",
+            message=f"Evaluation task {task_id} is {task_status}"
+        )
@@ -0,0 +1,127 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond index searches to multi-second LLM calls.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram. Observing is a bisect plus two additions under a lock."""
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[slot] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> tuple[list[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics: per-stage latency histograms, HTTP request counters and durations,
+    and a sliding one-minute window for the health endpoint. Rendered in Prometheus text format.
+    """
+    WINDOW_SECONDS = 60.0
+
+    def __init__(self):
+        self.stage_durations: dict[str, Histogram] = {}
+        self.request_durations: dict[str, Histogram] = {}
+        self.request_counts: dict[tuple[str, str, int], int] = {}
+        self._recent_requests: deque = deque()  # (timestamp, duration_seconds, is_error)
+        self._lock = threading.Lock()
+
+    def _histogram(self, histograms: dict, key: str) -> Histogram:
+        histogram = histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = histograms.setdefault(key, Histogram())
+        return histogram
+
+    def observe_stage(self, stage: str, seconds: float):
+        self._histogram(self.stage_durations, stage).observe(seconds)
+
+    @contextmanager
+    def time_stage(self, stage: str):
+        """Times the enclosed block (including any awaits inside it) as one `stage` observation."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start)
+
+    def observe_request(self, method: str, path: str, status_code: int, seconds: float):
+        self._histogram(self.request_durations, path).observe(seconds)
+        now = time.monotonic()
+        with self._lock:
+            key = (method, path, status_code)
+            self.request_counts[key] = self.request_counts.get(key, 0) + 1
+            self._recent_requests.append((now, seconds, status_code >= 500))
+            self._trim_window(now)
+
+    def _trim_window(self, now: float):
+        cutoff = now - self.WINDOW_SECONDS
+        while self._recent_requests and self._recent_requests[0][0] < cutoff:
+            self._recent_requests.popleft()
+
+    def recent_summary(self) -> dict:
+        """Requests, mean latency (seconds) and error rate over the last minute."""
+        with self._lock:
+            self._trim_window(time.monotonic())
+            recent = list(self._recent_requests)
+        if not recent:
+            return {"requests_per_minute": 0, "average_response_time": 0.0, "error_rate": 0.0}
+        return {
+            "requests_per_minute": len(recent),
+            "average_response_time": sum(duration for _, duration, _ in recent) / len(recent),
+            "error_rate": sum(1 for _, _, is_error in recent if is_error) / len(recent),
+        }
+
+    def render_prometheus(self) -> str:
+        lines = []
+        self._render_histograms(
+            lines, "policyeval_stage_duration_seconds",
+            "Latency of request processing stages.", "stage", self.stage_durations,
+        )
+        self._render_histograms(
+            lines, "policyeval_http_request_duration_seconds",
+            "HTTP request latency by route.", "path", self.request_durations,
+        )
+        lines.append("# HELP policyeval_http_requests_total HTTP requests by method, route and status.")
+        lines.append("# TYPE policyeval_http_requests_total counter")
+        with self._lock:
+            request_counts = dict(self.request_counts)
+        for (method, path, status_code), count in sorted(request_counts.items()):
+            lines.append(
+                f'policyeval_http_requests_total{{method="{method}",path="{path}",status="{status_code}"}} {count}'
+            )
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histograms(lines: list, name: str, help_text: str, label: str, histograms: dict):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for key, histogram in sorted(histograms.items()):
+            counts, total, count = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{{label}="{key}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{label}="{key}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{{label}="{key}"}} {total}')
+            lines.append(f'{name}_count{{{label}="{key}"}} {count}')
+
+
+metrics = MetricsRegistry()
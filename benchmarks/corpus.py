@@ -0,0 +1,107 @@
+import random
+from io import BytesIO
+
+import docx
+
+TOPICS = [
+    ("grace period", "A grace period of thirty (30) days is allowed for payment of the renewal premium."),
+    ("pre-existing diseases", "Pre-existing diseases are covered after thirty-six (36) months of continuous coverage."),
+    ("cataract surgery", "The waiting period for cataract surgery is two (2) years from the first policy inception."),
+    ("maternity", "Maternity expenses are covered after twenty-four (24) months, limited to two deliveries."),
+    ("organ donor", "Medical expenses for an organ donor are covered for harvesting the organ for an insured person."),
+    ("no claim discount", "A No Claim Discount of five percent (5%) of the base premium is offered on renewal."),
+    ("health check-up", "Expenses for preventive health check-ups are reimbursed at the end of every block of two years."),
+    ("hospital", "A Hospital means an institution with at least ten (10) in-patient beds and qualified nursing staff."),
+    ("AYUSH", "AYUSH treatment is covered up to the sum insured when taken in an AYUSH hospital."),
+    ("room rent", "For Plan A, room rent is capped at one percent (1%) of the sum insured per day and ICU charges at two percent (2%)."),
+]
+
+QUESTIONS = [
+    "What is the grace period for premium payment?",
+    "What is the waiting period for pre-existing diseases to be covered?",
+    "Does this policy cover maternity expenses, and what are the conditions?",
+    "What is the waiting period for cataract surgery?",
+    "Are the medical expenses for an organ donor covered under this policy?",
+    "What is the No Claim Discount offered in this policy?",
+    "Is there a benefit for preventive health check-ups?",
+    "How does the policy define a 'Hospital'?",
+    "What is the extent of coverage for AYUSH treatments?",
+    "Are there any sub-limits on room rent and ICU charges for Plan A?",
+]
+
+FILLER = (
+    "The insured person shall comply with all terms and conditions of this policy. "
+    "Claims must be intimated within the stipulated period with all supporting documents. "
+    "The company reserves the right to verify any claim before settlement. "
+)
+
+
+def synthetic_pages(n_pages: int, seed: int = 0) -> list[str]:
+    """Deterministic policy-like text: numbered sections with the benchmark topics spread across pages."""
+    rng = random.Random(seed)
+    pages = []
+    for page_number in range(1, n_pages + 1):
+        lines = []
+        for section in range(1, 5):
+            _, clause = TOPICS[rng.randrange(len(TOPICS))]
+            lines.append(f"{page_number}.{section} SECTION {page_number}.{section}")
+            lines.append(f"{clause} {FILLER * rng.randint(1, 3)}")
+        pages.append("\n".join(lines))
+    return pages
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(pages: list[str]) -> bytes:
+    """Writes a minimal text PDF (Helvetica, one page per entry) without any PDF-writing dependency."""
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>", 3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    page_ids = []
+    next_id = 4
+    for text in pages:
+        lines = []
+        for line in text.split("\n"):
+            # Wrap long lines so the text stays on the page.
+            while len(line) > 95:
+                cut = line.rfind(" ", 0, 95)
+                cut = cut if cut > 0 else 95
+                lines.append(line[:cut])
+                line = line[cut:].lstrip()
+            lines.append(line)
+        body = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({_pdf_escape(line)}) Tj T*" for line in lines) + " ET"
+        stream = body.encode("latin-1", errors="replace")
+        content_id, page_id = next_id, next_id + 1
+        next_id += 2
+        objects[content_id] = b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        objects[page_id] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(page_id)
+    objects[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % page_id for page_id in page_ids), len(page_ids)
+    )
+
+    out = BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = {}
+    for object_id in sorted(objects):
+        offsets[object_id] = out.tell()
+        out.write(b"%d 0 obj\n" % object_id + objects[object_id] + b"\nendobj\n")
+    xref_offset = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for object_id in sorted(objects):
+        out.write(b"%010d 00000 n \n" % offsets[object_id])
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset))
+    return out.getvalue()
+
+
+def build_docx(pages: list[str]) -> bytes:
+    document = docx.Document()
+    for text in pages:
+        for line in text.split("\n"):
+            document.add_paragraph(line)
+    out = BytesIO()
+    document.save(out)
+    return out.getvalue()
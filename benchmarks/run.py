@@ -0,0 +1,237 @@
+"""
+Offline benchmark suite: per-stage microbenchmarks and end-to-end /hackrx/run load tests
+against a deterministic local stand-in for Gemini. No network access or API key is needed.
+
+Usage:
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --baseline bench.json --fail-threshold 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.corpus import QUESTIONS, build_docx, build_pdf, synthetic_pages
+
+
+def _prepare_environment(use_caches: bool):
+    """
+    Settings are read when the app is first imported, so this must run before any `app.*` import.
+    Caches live in a fresh temporary directory so runs never see each other's results.
+    """
+    os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+    # Warm-up would call the real Gemini API; the stub client needs none.
+    os.environ["WARMUP_ENABLED"] = "false"
+    cache_root = tempfile.mkdtemp(prefix="policyeval-bench-")
+    os.environ["INGESTION_CACHE_DIR"] = os.path.join(cache_root, "ingestion")
+    os.environ["VECTOR_INDEX_DIR"] = os.path.join(cache_root, "indexes")
+    os.environ["EMBEDDING_STORE_PATH"] = os.path.join(cache_root, "embeddings.sqlite3")
+    os.environ["OCR_CACHE_DIR"] = os.path.join(cache_root, "ocr")
+    for flag in ("INGESTION_CACHE_ENABLED", "VECTOR_INDEX_STORE_ENABLED", "EMBEDDING_STORE_ENABLED", "ANSWER_CACHE_ENABLED"):
+        os.environ[flag] = "true" if use_caches else "false"
+
+
+def _summarize(samples_s: list[float]) -> dict:
+    ordered = sorted(samples_s)
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))] * 1000
+    return {
+        "runs": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": percentile(0.50),
+        "p99_ms": percentile(0.99),
+    }
+
+
+def _time(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return _summarize(samples)
+
+
+def run_microbenchmarks(page_counts: list[int], repeat: int) -> dict:
+    from io import BytesIO
+    from app.services.document_processor import DocumentProcessor
+    from app.services.embedding_providers import HashingEmbeddingProvider
+    from app.services.text_extractor import text_extractor
+    from app.services.vector_store_service import VectorStoreService
+    from benchmarks.stub_gemini import StubGeminiProcessor
+
+    processor = DocumentProcessor()
+    stub = StubGeminiProcessor()
+    hashing_provider = HashingEmbeddingProvider(stub.dimension)
+    results = {}
+    for n_pages in page_counts:
+        pages = synthetic_pages(n_pages)
+        for kind, data in (("pdf", build_pdf(pages)), ("docx", build_docx(pages))):
+            filename = f"policy.{kind}"
+            results[f"extract_text/{kind}/{n_pages}p"] = _time(
+                lambda: processor._extract_text(BytesIO(data), filename), repeat
+            )
+            results[f"extract_pages_pool/{kind}/{n_pages}p"] = _time(
+                lambda: asyncio.run(text_extractor.extract_pages(BytesIO(data), filename)), repeat
+            )
+
+        text = processor._clean_text("\n\n".join(pages))
+        results[f"chunk_text/{n_pages}p"] = _time(lambda: processor._chunk_text(text), repeat)
+
+        chunks = processor._chunk_text(text)
+        results[f"embed_hashing/{n_pages}p/{len(chunks)}chunks"] = _time(
+            lambda: hashing_provider.embed_matrix(chunks), repeat
+        )
+        documents = [{"text": chunk, "embedding": stub.embed_text(chunk)} for chunk in chunks]
+        results[f"add_documents/{n_pages}p/{len(chunks)}chunks"] = _time(
+            lambda: VectorStoreService(dimension=stub.dimension).add_documents(documents), repeat
+        )
+
+        vector_store = VectorStoreService(dimension=stub.dimension)
+        vector_store.add_documents(documents)
+        queries = [stub.embed_text(question) for question in QUESTIONS]
+        results[f"search/{n_pages}p/{len(chunks)}chunks"] = _time(
+            lambda: [vector_store.search(query, top_k=5) for query in queries], repeat
+        )
+    return results
+
+
+async def run_end_to_end(page_counts: list[int], concurrency_levels: list[int], requests_per_level: int, latency_ms: float, jitter_ms: float) -> dict:
+    from app.core.config import settings
+    from app.main import app
+    from app.services.document_fetcher import document_fetcher
+    from app.services.qa_service import QAService
+    from benchmarks.stub_gemini import StubGeminiProcessor
+
+    documents = {}
+    for n_pages in page_counts:
+        documents[f"/policy-{n_pages}.pdf"] = build_pdf(synthetic_pages(n_pages, seed=n_pages))
+
+    def serve_document(request: httpx.Request) -> httpx.Response:
+        body = documents.get(request.url.path)
+        if body is None:
+            return httpx.Response(404)
+        headers = {"ETag": f'"{request.url.path}"', "Content-Length": str(len(body))}
+        return httpx.Response(200, headers=headers, content=b"" if request.method == "HEAD" else body)
+
+    headers = {"Authorization": f"Bearer {settings.HACKRX_API_KEY}"}
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    # ASGITransport does not send lifespan events, so run the app's startup/shutdown explicitly.
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        app.state.qa_service = QAService(gemini_service=StubGeminiProcessor(latency_ms=latency_ms, jitter_ms=jitter_ms))
+        # Route document downloads to the in-memory corpus instead of the network.
+        document_fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(serve_document))
+
+        for n_pages in page_counts:
+            payload = {"documents": f"http://corpus.local/policy-{n_pages}.pdf", "questions": QUESTIONS}
+            for concurrency in concurrency_levels:
+                semaphore = asyncio.Semaphore(concurrency)
+                latencies = []
+                failures = 0
+
+                async def one_request():
+                    nonlocal failures
+                    async with semaphore:
+                        start = time.perf_counter()
+                        response = await client.post("/hackrx/run", json=payload, headers=headers, timeout=300)
+                        latencies.append(time.perf_counter() - start)
+                        if response.status_code != 200:
+                            failures += 1
+
+                wall_start = time.perf_counter()
+                await asyncio.gather(*[one_request() for _ in range(requests_per_level)])
+                wall = time.perf_counter() - wall_start
+
+                summary = _summarize(latencies)
+                summary["throughput_rps"] = requests_per_level / wall
+                summary["failures"] = failures
+                results[f"hackrx_run/{n_pages}p/c{concurrency}"] = summary
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Prints p50 changes versus a baseline run and returns the names of regressions beyond `threshold`."""
+    regressions = []
+    for section in ("startup", "micro", "e2e"):
+        for name, metrics in current.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name)
+            if not previous or not previous.get("p50_ms"):
+                continue
+            change = (metrics["p50_ms"] - previous["p50_ms"]) / previous["p50_ms"]
+            marker = "REGRESSION" if change > threshold else ""
+            print(f"{section:5} {name:45} p50 {previous['p50_ms']:9.2f} -> {metrics['p50_ms']:9.2f} ms ({change:+.1%}) {marker}")
+            if change > threshold:
+                regressions.append(name)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default="10,50,150", help="Comma-separated synthetic document sizes, in pages.")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated end-to-end concurrency levels.")
+    parser.add_argument("--requests", type=int, default=32, help="End-to-end requests per concurrency level.")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions per microbenchmark.")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Simulated latency per stub Gemini call.")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Uniform jitter applied to the simulated latency.")
+    parser.add_argument("--use-caches", action="store_true", help="Keep ingestion, index and answer caches on (measures warm repeats).")
+    parser.add_argument("--import-runs", type=int, default=5, help="Fresh interpreters used to time `import app.main`.")
+    parser.add_argument("--skip-startup", action="store_true")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-e2e", action="store_true")
+    parser.add_argument("--output", help="Write results as JSON to this path.")
+    parser.add_argument("--baseline", help="Compare against a previous --output file.")
+    parser.add_argument("--fail-threshold", type=float, default=0.2, help="Relative p50 slowdown counted as a regression.")
+    args = parser.parse_args(argv)
+
+    _prepare_environment(args.use_caches)
+    page_counts = [int(n) for n in args.pages.split(",")]
+    concurrency_levels = [int(n) for n in args.concurrency.split(",")]
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "use_caches": args.use_caches,
+        },
+        "startup": {},
+        "micro": {},
+        "e2e": {},
+    }
+    if not args.skip_startup:
+        from benchmarks.startup import measure_import_time
+        results["startup"]["import app.main"] = measure_import_time("app.main", args.import_runs)
+    if not args.skip_micro:
+        results["micro"] = run_microbenchmarks(page_counts, args.repeat)
+    if not args.skip_e2e:
+        results["e2e"] = asyncio.run(run_end_to_end(
+            page_counts, concurrency_levels, args.requests, args.latency_ms, args.jitter_ms
+        ))
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.fail_threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
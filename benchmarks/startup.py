@@ -0,0 +1,65 @@
+"""
+Cold-start benchmark: imports the app in fresh interpreters and reports wall-clock import time,
+plus the slowest modules from `python -X importtime` for the last run.
+
+Usage:
+    python -m benchmarks.startup --runs 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _parse_importtime(stderr: str, top: int) -> list[dict]:
+    """Returns the `top` modules by cumulative import time from `-X importtime` output."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+        modules.append({"module": name.strip(), "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    modules.sort(key=lambda module: module["cumulative_ms"], reverse=True)
+    return modules[:top]
+
+
+def measure_import_time(module: str = "app.main", runs: int = 5, top: int = 15) -> dict:
+    """Imports `module` in `runs` fresh interpreters; the environment (e.g. GEMINI_API_KEY) is inherited."""
+    from benchmarks.run import _summarize
+
+    samples = []
+    stderr = ""
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=False,
+        )
+        samples.append(time.perf_counter() - start)
+        if completed.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+        stderr = completed.stderr
+
+    summary = _summarize(samples)
+    summary["slowest_imports"] = _parse_importtime(stderr, top)
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main", help="Module to import.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time.")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list.")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+    print(json.dumps(measure_import_time(args.module, args.runs, args.top), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
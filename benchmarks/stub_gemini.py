@@ -0,0 +1,105 @@
+import asyncio
+import hashlib
+import json
+import random
+import re
+
+import numpy as np
+
+from app.services.gemini_service import GeminiEmbeddingProvider, GeminiPolicyProcessor
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class _StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _StubModel:
+    """Stands in for `genai.GenerativeModel`: sleeps for a simulated latency, then returns canned JSON/text."""
+    def __init__(self, processor: "StubGeminiProcessor"):
+        self.processor = processor
+
+    async def generate_content_async(self, prompt: str, generation_config: dict = None):
+        await self.processor.simulate_latency()
+        return _StubResponse(self.processor.respond(prompt))
+
+
+class _StubEmbeddingProvider(GeminiEmbeddingProvider):
+    """The Gemini embedding provider with only its API call replaced, so the scheduler still runs."""
+    def __init__(self, processor: "StubGeminiProcessor", dimension: int):
+        super().__init__(f"stub-embedding-{dimension}", dimension)
+        self.processor = processor
+
+    async def _embed_content(self, content, task_type: str) -> list:
+        await self.processor.simulate_latency()
+        if isinstance(content, str):
+            return self.processor.embed_text(content)
+        return [self.processor.embed_text(text) for text in content]
+
+
+class StubGeminiProcessor(GeminiPolicyProcessor):
+    """
+    Offline, deterministic drop-in for GeminiPolicyProcessor. Only the two network calls are
+    replaced (the generative model and the embedding provider's `_embed_content`), so prompt
+    building, batching, parsing and the embedding scheduler run exactly as in production.
+
+    Embeddings are hashed bag-of-words vectors, so retrieval over them is still meaningful.
+    Every call sleeps for `latency_ms` +/- `jitter_ms`, drawn from a seeded RNG.
+    """
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, dimension: int = 768, seed: int = 0):
+        # Deliberately skips the parent __init__: no API key, no genai.configure.
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.dimension = dimension
+        self.embedding_provider = _StubEmbeddingProvider(self, dimension)
+        self.embedding_model = self.embedding_provider.name
+        self.model = _StubModel(self)
+        self._rng = random.Random(seed)
+
+    async def simulate_latency(self):
+        delay_ms = self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+
+    def embed_text(self, text: str) -> list[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimension
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def respond(self, prompt: str) -> str:
+        if "Return a JSON array with exactly one object per question" in prompt:
+            questions = re.findall(r"^(\d+)\. (.+)$", prompt.split("Policy Document Context:")[0], re.MULTILINE)
+            answers = [
+                {"question_number": int(number), "answer": f"Stub answer to: {question}"}
+                for number, question in questions
+            ]
+            return f"```json\n{json.dumps(answers)}\n```"
+        if "Extract structured information" in prompt:
+            return '```json\n{"age": 46, "gender": "M", "procedure": "knee surgery", "location": "Pune", "policy_duration_months": 3}\n```'
+        if "Analyze these policy document sections" in prompt:
+            clauses = [{
+                "source_index": 0,
+                "clause_id": "stub-clause-1",
+                "relevance_score": 0.9,
+                "clause_type": "inclusion",
+                "matched_criteria": ["procedure"],
+                "extracted_rules": {
+                    "waiting_period_months": None,
+                    "pre_existing_condition_clause": False,
+                    "coverage_amount": 100000,
+                    "exclusions_mentioned": [],
+                    "conditions_mentioned": [],
+                },
+                "reasoning": "Stub analysis.",
+            }]
+            return f"```json\n{json.dumps(clauses)}\n```"
+        if "needs manual review" in prompt:
+            return '```json\n{"reasoning": "Stub review narrative.", "recommendations": ["Stub recommendation."]}\n```'
+        question = re.search(r"^Question: (.+)$", prompt, re.MULTILINE)
+        return f"Stub answer to: {question.group(1) if question else 'unknown question'}"